@@ -0,0 +1,281 @@
+# batch_sim.py
+# Survival statistics for level balancing. Plays thousands of headless
+# episodes with simple bot policies over a process pool. Each episode has its
+# own seed and level, and the results are aggregated as they stream in:
+# outcome and death cause rates, time to exit and the oxygen margin left at
+# the exit, per level and policy.
+#
+#   python batch_sim.py --episodes 2000 --levels 1,2,3 --policies wander,exit,evasive
+import sys
+import os
+import json
+import math
+import random
+import argparse
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import level_compiler
+
+POLICIES = ("idle", "wander", "exit", "evasive")
+OUTCOMES = ("exit", "oxygen", "voidwalker", "timeout")
+
+# Set once per worker process by init_worker
+game = None
+
+def init_worker():
+    global game
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import main
+    game = main.Game(headless=True)
+
+class WanderPolicy:
+    # Holds a random direction (or stands still) for a random stretch
+    def __init__(self, rng):
+        self.rng = rng
+        self.movement = (0, 0)
+        self.hold = 0
+
+    def __call__(self, game):
+        if self.hold <= 0:
+            self.movement = (self.rng.randint(-1, 1), self.rng.randint(-1, 1))
+            self.hold = self.rng.randint(15, 90)
+        self.hold -= 1
+        return self.movement
+
+class ExitPolicy:
+    # Follows a shortest path to the exit over the level's tile grid, using
+    # the same flow field voidwalkers chase the player with
+    def __init__(self, rng, level):
+        import main
+        self.main = main
+        data = level.level_data
+        blocked = data.get("occupancy")
+        if blocked is None:
+            blocked = b"".join(level_compiler.occupancy_rows(data))
+        footprint = math.ceil(main.Player(0, 0).width / main.TILE_SIZE)
+        self.field = main.FlowField(data["width"], data["height"], blocked, footprint,
+                                    radius=data["width"] + data["height"])
+        # The exit often sits in a corner the player only half fits into;
+        # aim for a tile from which the player still overlaps it
+        exit_x, exit_y = data["exit"]["x"], data["exit"]["y"]
+        width, height = data["width"], data["height"]
+        candidates = [(tx, ty)
+                      for ty in range(exit_y, exit_y - footprint, -1)
+                      for tx in range(exit_x, exit_x - footprint, -1)
+                      if 0 <= tx < width and 0 <= ty < height
+                      and self.field.passable[ty * width + tx]]
+        target = candidates[0] if candidates else (exit_x, exit_y)
+        self.field.set_target(*target)
+
+    def __call__(self, game):
+        player = game.player
+        step = self.field.next_step(*game.level.nearest_tile(player.x, player.y))
+        if step is None:
+            target_x, target_y = game.level.exit_rect.x, game.level.exit_rect.y
+        else:
+            target_x, target_y = step[0] * self.main.TILE_SIZE, step[1] * self.main.TILE_SIZE
+        return self.toward(player, target_x - player.x, target_y - player.y)
+
+    def toward(self, player, dx, dy):
+        # Stop on an axis once within half a step, so the bot doesn't jitter
+        slack = player.speed * self.main.FIXED_DT / 2
+        return ((dx > slack) - (dx < -slack), (dy > slack) - (dy < -slack))
+
+class EvasivePolicy(ExitPolicy):
+    # Heads for the exit, but backs away from a chasing voidwalker that gets close
+    DANGER_RANGE = 80
+
+    def __call__(self, game):
+        player = game.player
+        level = game.level
+        area = player.rect.inflate(self.DANGER_RANGE * 2, self.DANGER_RANGE * 2)
+        nearby = level.voidwalker_grid.query(area)
+        if level.swarm is not None and nearby:
+            level.swarm.sync(nearby)
+        threats = [v for v in nearby if v.chase_mode]
+        if not threats:
+            return super().__call__(game)
+        closest = min(threats, key=lambda v: (v.x - player.x) ** 2 + (v.y - player.y) ** 2)
+        return self.toward(player, player.x - closest.x, player.y - closest.y)
+
+def make_policy(name, rng, level):
+    if name == "idle":
+        return lambda game: (0, 0)
+    if name == "wander":
+        return WanderPolicy(rng)
+    if name == "exit":
+        return ExitPolicy(rng, level)
+    return EvasivePolicy(rng, level)
+
+def run_episode(episode):
+    import main
+    game.seed = episode["seed"]
+    game.start_session(episode["level"])
+    game.state = main.GameState.PLAYING
+    policy = make_policy(episode["policy"], random.Random(episode["seed"]), game.level)
+
+    lowest = [game.player.oxygen]
+    def tracked(game):
+        lowest[0] = min(lowest[0], game.player.oxygen)
+        return policy(game)
+
+    ticks = game.simulate(episode["max_ticks"], tracked)
+    if game.state == main.GameState.GAME_OVER and not game.victory:
+        outcome = game.death_cause
+    elif game.state in (main.GameState.LEVEL_COMPLETE, main.GameState.GAME_OVER):
+        outcome = "exit"
+    else:
+        outcome = "timeout"
+    return dict(episode, outcome=outcome, ticks=ticks,
+                seconds=round(ticks * main.FIXED_DT, 3),
+                oxygen=round(game.player.oxygen, 3),
+                lowest_oxygen=round(min(lowest[0], game.player.oxygen), 3))
+
+def run_batch(episodes):
+    # One task per batch keeps the pool's per-task overhead out of the way
+    return [run_episode(episode) for episode in episodes]
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+class Report:
+    # Running aggregate per (level, policy)
+    def __init__(self):
+        self.groups = defaultdict(lambda: {"outcomes": defaultdict(int),
+                                           "exit_seconds": [], "exit_oxygen": []})
+        self.count = 0
+
+    def add(self, result):
+        group = self.groups[(result["level"], result["policy"])]
+        group["outcomes"][result["outcome"]] += 1
+        if result["outcome"] == "exit":
+            group["exit_seconds"].append(result["seconds"])
+            group["exit_oxygen"].append(result["oxygen"])
+        self.count += 1
+
+    def summary(self):
+        rows = []
+        for (level, policy), group in sorted(self.groups.items()):
+            episodes = sum(group["outcomes"].values())
+            seconds, oxygen = group["exit_seconds"], group["exit_oxygen"]
+            rows.append({
+                "level": level,
+                "policy": policy,
+                "episodes": episodes,
+                "rates": {outcome: round(group["outcomes"][outcome] / episodes, 4)
+                          for outcome in OUTCOMES},
+                "time_to_exit_s": {
+                    "mean": round(sum(seconds) / len(seconds), 3) if seconds else None,
+                    "p50": percentile(seconds, 0.5),
+                    "p90": percentile(seconds, 0.9),
+                },
+                "oxygen_margin": {
+                    "mean": round(sum(oxygen) / len(oxygen), 3) if oxygen else None,
+                    "p10": percentile(oxygen, 0.1),
+                    "min": min(oxygen, default=None),
+                },
+            })
+        return rows
+
+    def print_table(self, out=sys.stdout):
+        print(f"{'level':>5} {'policy':<8} {'runs':>6}  {'exit':>6} {'oxygen':>6} "
+              f"{'voidw':>6} {'t/out':>6}  {'exit s p50':>10}  {'O2 mean':>7} {'O2 p10':>7}", file=out)
+        for row in self.summary():
+            rates = row["rates"]
+            exit_time = row["time_to_exit_s"]["p50"]
+            margin = row["oxygen_margin"]
+            print(f"{row['level']:>5} {row['policy']:<8} {row['episodes']:>6}  "
+                  f"{rates['exit']:>6.1%} {rates['oxygen']:>6.1%} "
+                  f"{rates['voidwalker']:>6.1%} {rates['timeout']:>6.1%}  "
+                  f"{exit_time if exit_time is not None else '-':>10}  "
+                  f"{margin['mean'] if margin['mean'] is not None else '-':>7} "
+                  f"{margin['p10'] if margin['p10'] is not None else '-':>7}", file=out)
+
+def make_episodes(args, levels, policies):
+    # Seeds come from one generator so a batch is reproducible from --seed
+    rng = random.Random(args.seed)
+    episodes = []
+    for index in range(args.episodes):
+        episodes.append({
+            "episode": index,
+            "level": levels[index % len(levels)],
+            "policy": policies[index // len(levels) % len(policies)],
+            "seed": rng.randrange(2 ** 31),
+            "max_ticks": args.max_ticks,
+        })
+    return episodes
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Eclipse Protocol batch simulator")
+    parser.add_argument("--episodes", type=int, default=1000,
+                        help="number of episodes to play")
+    parser.add_argument("--levels", default="1,2,3",
+                        help="comma-separated level indices, assigned round-robin")
+    parser.add_argument("--policies", default="wander,exit,evasive",
+                        help=f"comma-separated bot policies ({', '.join(POLICIES)})")
+    parser.add_argument("--max-ticks", type=int, default=60 * 60,
+                        help="ticks before an episode counts as a timeout")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--batch", type=int, default=25,
+                        help="episodes handed to a worker at a time")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the per-episode seeds")
+    parser.add_argument("--out", default=None, metavar="PATH",
+                        help="stream per-episode results to PATH as JSON lines")
+    parser.add_argument("--report", default=None, metavar="PATH",
+                        help="write the aggregate report to PATH as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    levels = [int(level) for level in args.levels.split(",") if level]
+    policies = [name for name in args.policies.split(",") if name]
+    for name in policies:
+        if name not in POLICIES:
+            sys.exit(f"unknown policy {name!r}; choose from {', '.join(POLICIES)}")
+    # Build the level cache once so the workers don't all race to write it
+    level_count = len(level_compiler.load_levels()["levels"])
+    for level in levels:
+        if not 0 <= level < level_count:
+            sys.exit(f"level {level} out of range (0-{level_count - 1})")
+
+    episodes = make_episodes(args, levels, policies)
+    batches = [episodes[i:i + args.batch] for i in range(0, len(episodes), args.batch)]
+    report = Report()
+    out = open(args.out, "w") if args.out else None
+    start = time.perf_counter()
+    last_progress = start
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+            futures = [pool.submit(run_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                for result in future.result():
+                    report.add(result)
+                    if out is not None:
+                        out.write(json.dumps(result) + "\n")
+                now = time.perf_counter()
+                if now - last_progress >= 2:
+                    last_progress = now
+                    print(f"  {report.count}/{len(episodes)} episodes, "
+                          f"{report.count / (now - start):.0f}/s", file=sys.stderr)
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    report.print_table()
+    print(f"{report.count} episodes in {elapsed:.1f}s ({report.count / elapsed:.0f}/s)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"episodes": report.count, "elapsed_s": round(elapsed, 3),
+                       "groups": report.summary()}, f, indent=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+# benchmark.py
+# Scaling benchmark. Generates synthetic levels in the levels.json schema with
+# a given number of walls, oxygen stations and voidwalkers, then drives the
+# game headlessly with scripted input. Per scenario it reports level build
+# time, ticks/s, per-subsystem frame times (from FrameProfiler) and peak
+# memory. Every scenario runs in a fresh process so the memory peaks don't
+# leak into each other. Results print as a table and can be saved as JSON
+# for comparing commits:
+#
+#   python benchmark.py --sizes 100,1000,10000,100000 --out bench.json
+import sys
+import os
+import json
+import math
+import random
+import argparse
+import subprocess
+import time
+import multiprocessing
+
+try:
+    import resource
+except ImportError:
+    # Windows: peak memory is left out of the report
+    resource = None
+
+DEFAULT_SIZES = "100,1000,10000,100000"
+
+# Tiles a voidwalker needs free around its spawn point (it is 48px wide)
+VOIDWALKER_TILES = 2
+
+def map_side(walls, stations, voidwalkers):
+    # Square map large enough that the entities fill about a quarter of it
+    tiles = walls * 3 + stations + voidwalkers * VOIDWALKER_TILES ** 2
+    return max(40, math.ceil(math.sqrt(tiles * 4)))
+
+def generate_level(walls, stations, voidwalkers, seed=0):
+    # A square map with a border, short straight wall segments and entities
+    # scattered on free tiles. The same arguments always give the same level.
+    rng = random.Random(seed)
+    side = map_side(walls, stations, voidwalkers)
+    blocked = bytearray(side * side)
+
+    def free(x, y, w, h):
+        if x < 1 or y < 1 or x + w > side - 1 or y + h > side - 1:
+            return False
+        return all(not any(blocked[row * side + x:row * side + x + w])
+                   for row in range(y, y + h))
+
+    def block(x, y, w, h):
+        for row in range(y, y + h):
+            blocked[row * side + x:row * side + x + w] = b"\x01" * w
+
+    def place(w, h):
+        # Random free spot; gives up on crowded maps rather than looping forever
+        for _ in range(100):
+            x = rng.randrange(1, side - w)
+            y = rng.randrange(1, side - h)
+            if free(x, y, w, h):
+                block(x, y, w, h)
+                return x, y
+        return None
+
+    # Keep the player's start and the exit clear
+    start = (side // 2, side // 2)
+    exit_tile = (side - 3, side - 3)
+    block(start[0] - 2, start[1] - 2, 5, 5)
+    block(exit_tile[0], exit_tile[1], 1, 1)
+
+    level_walls = [
+        {"x": 0, "y": 0, "width": side, "height": 1},
+        {"x": 0, "y": side - 1, "width": side, "height": 1},
+        {"x": 0, "y": 0, "width": 1, "height": side},
+        {"x": side - 1, "y": 0, "width": 1, "height": side},
+    ]
+    # Entity spots are reserved first so walls can't crowd them out
+    level_stations = []
+    for _ in range(stations):
+        spot = place(1, 1)
+        if spot is not None:
+            level_stations.append({"x": spot[0], "y": spot[1]})
+    level_voidwalkers = []
+    for _ in range(voidwalkers):
+        spot = place(VOIDWALKER_TILES, VOIDWALKER_TILES)
+        if spot is not None:
+            level_voidwalkers.append({"x": spot[0], "y": spot[1]})
+
+    # The border counts towards the wall total
+    for _ in range(max(walls - len(level_walls), 0)):
+        length = rng.randint(1, 4)
+        w, h = (length, 1) if rng.random() < 0.5 else (1, length)
+        spot = place(w, h)
+        if spot is not None:
+            level_walls.append({"x": spot[0], "y": spot[1], "width": w, "height": h})
+
+    return {
+        "width": side,
+        "height": side,
+        "walls": level_walls,
+        "oxygen_stations": level_stations,
+        "voidwalkers": level_voidwalkers,
+        "player_start": {"x": start[0], "y": start[1]},
+        "exit": {"x": exit_tile[0], "y": exit_tile[1]},
+    }
+
+def scripted_movement(tick):
+    # A fixed tour through all eight directions, 45 ticks each, so every run
+    # sees the same inputs and the camera keeps crossing new regions
+    directions = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+    return directions[tick // 45 % len(directions)]
+
+def sweep_tunnels(level, rng, walls=200, steps=40):
+    # Pushes a voidwalker-sized box at a fractional position into walls from
+    # the left in small steps, the way chasers move. Counts the walls the
+    # box ends up overlapping; Level.sweep has to stop it at every one.
+    size = 48
+    tunnels = 0
+    for wall in level.walls[:walls]:
+        rect = wall.rect
+        x = rect.left - size - rng.uniform(0.1, 2)
+        y = rect.top
+        for _ in range(steps):
+            x, y, _, _ = level.sweep(x, y, size, size, rng.uniform(0.5, 3), 0)
+        tunnels += x + size > rect.left
+    return tunnels
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def run_scenario(scenario):
+    # Runs in its own process; returns the result dict for one scenario
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import main
+
+    # The --parity rerun keeps every voidwalker on the per-object path
+    swarm_threshold = main.SWARM_THRESHOLD
+    if scenario.get("object_path"):
+        main.SWARM_THRESHOLD = sys.maxsize
+    game = main.Game(headless=True, seed=scenario["seed"])
+    game.set_render_scale(scenario["render_scale"])
+    rss_before = peak_rss_kb()
+
+    start = time.perf_counter()
+    level_data = generate_level(scenario["walls"], scenario["stations"],
+                                scenario["voidwalkers"], scenario["seed"])
+    generate_ms = (time.perf_counter() - start) * 1000
+
+    game.level_data = {"levels": [level_data]}
+    game.current_level = 0
+    start = time.perf_counter()
+    game.build_level()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    ticks = scenario["ticks"]
+    game.profiler = main.FrameProfiler(capacity=ticks)
+    game.state = main.GameState.PLAYING
+    deaths = 0
+    start = time.perf_counter()
+    for tick in range(ticks):
+        game.profiler.begin_frame()
+        game.step(main.FIXED_DT, scripted_movement(tick))
+        if scenario["draw"]:
+            game.draw()
+        game.profiler.end_frame(game.entity_counts())
+        if game.state != main.GameState.PLAYING:
+            # Keep the run going so every scenario measures the same ticks
+            deaths += 1
+            game.state = main.GameState.PLAYING
+            game.player.oxygen = 100
+    elapsed = time.perf_counter() - start
+    tunnels = sweep_tunnels(game.level, random.Random(scenario["seed"]))
+    # Streaming parks voidwalkers in their region's record while it is unloaded
+    parked = sum(len(record["voidwalkers"]) for record in game.level.chunk_records.values())
+
+    profiler = game.profiler
+    slots = profiler.recorded()
+    summary = profiler.summary()
+    phases = {}
+    for i, name in enumerate(profiler.PHASES + ("frame",)):
+        total = sum(profiler.column(i, slots))
+        phases[name] = dict(summary[name], total_ms=round(total * 1000, 3),
+                            mean_ms=round(total * 1000 / max(len(slots), 1), 4))
+
+    result = {
+        "scenario": scenario,
+        "map_tiles": [level_data["width"], level_data["height"]],
+        "placed": {
+            "walls": len(level_data["walls"]),
+            "oxygen_stations": len(level_data["oxygen_stations"]),
+            "voidwalkers": len(level_data["voidwalkers"]),
+        },
+        "resident": {
+            "walls": len(game.level.walls),
+            "oxygen_stations": len(game.level.oxygen_stations),
+            "voidwalkers": len(game.level.voidwalkers),
+        },
+        "parked_voidwalkers": parked,
+        "sweep_tunnels": tunnels,
+        "swarm": game.level.swarm is not None,
+        "generate_ms": round(generate_ms, 3),
+        "level_build_ms": round(build_ms, 3),
+        "ticks": ticks,
+        "elapsed_s": round(elapsed, 4),
+        "ticks_per_s": round(ticks / elapsed, 1) if elapsed > 0 else None,
+        "deaths": deaths,
+        "checksum": game.state_checksum(),
+        "phases": phases,
+        "rss_before_level_kb": rss_before,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    # Cached surfaces belong to this display; with --in-process the next
+    # scenario opens a new one
+    main.AssetCache.clear()
+    main.pygame.quit()
+    main.SWARM_THRESHOLD = swarm_threshold
+    return result
+
+def run_isolated(scenario):
+    # A fresh interpreter per scenario keeps the peak memory figures honest
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(run_scenario, (scenario,))
+
+def current_commit():
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, check=True)
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_result(result):
+    scenario = result["scenario"]
+    phases = result["phases"]
+    rss = result["peak_rss_kb"]
+    print(f"{scenario['size']:>7}  "
+          f"{result['placed']['walls']:>7} {result['placed']['oxygen_stations']:>6} "
+          f"{result['placed']['voidwalkers']:>7}  "
+          f"{result['level_build_ms']:>9.1f}  {result['ticks_per_s']:>9.0f}  "
+          f"{phases['input']['mean_ms']:>7.3f} {phases['voidwalkers']['mean_ms']:>7.3f} "
+          f"{phases['draw']['mean_ms']:>7.3f} {phases['frame']['p99']:>7.3f}  "
+          f"{rss // 1024 if rss is not None else '-':>6}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Eclipse Protocol scaling benchmark")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="comma-separated scenario sizes (default: %(default)s)")
+    parser.add_argument("--walls", type=float, default=1.0,
+                        help="walls per unit of size")
+    parser.add_argument("--stations", type=float, default=0.1,
+                        help="oxygen stations per unit of size")
+    parser.add_argument("--voidwalkers", type=float, default=1.0,
+                        help="voidwalkers per unit of size")
+    parser.add_argument("--ticks", type=int, default=600,
+                        help="simulation ticks per scenario")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for level generation and the game")
+    parser.add_argument("--no-draw", action="store_true",
+                        help="only run the simulation, skip Game.draw")
+    parser.add_argument("--render-scale", type=float, default=1.0,
+                        help="fraction of the window's resolution the world is drawn at")
+    parser.add_argument("--parity", action="store_true",
+                        help="rerun every size without the NumPy swarm and check the end states match")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run every scenario in this process (peak memory becomes cumulative)")
+    parser.add_argument("--out", default=None, metavar="PATH",
+                        help="write the results as JSON to PATH ('-' for stdout)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    quiet = args.out == "-"
+
+    if not quiet:
+        print(f"{'size':>7}  {'walls':>7} {'o2':>6} {'voidw':>7}  {'build ms':>9}  "
+              f"{'ticks/s':>9}  {'input':>7} {'voidw':>7} {'draw':>7} {'p99':>7}  {'MB':>6}")
+    results = []
+    for size in sizes:
+        scenario = {
+            "size": size,
+            "walls": round(size * args.walls),
+            "stations": round(size * args.stations),
+            "voidwalkers": round(size * args.voidwalkers),
+            "ticks": args.ticks,
+            "seed": args.seed,
+            "draw": not args.no_draw,
+            "render_scale": args.render_scale,
+        }
+        run = run_scenario if args.in_process else run_isolated
+        result = run(scenario)
+        results.append(result)
+        if not quiet:
+            print_result(result)
+        if args.parity:
+            # Same inputs, so the swarm and the per-object path have to agree
+            reference = run(dict(scenario, object_path=True))
+            if reference["checksum"] != result["checksum"]:
+                sys.exit(f"size {size}: the swarm and per-object paths end in different states")
+        # Every voidwalker is either loaded or parked, however long the run
+        placed = result["placed"]["voidwalkers"]
+        kept = result["resident"]["voidwalkers"] + result["parked_voidwalkers"]
+        if kept != placed:
+            sys.exit(f"size {size}: {placed} voidwalkers placed but {kept} left after the run")
+        if result["sweep_tunnels"]:
+            sys.exit(f"size {size}: a swept box passed into {result['sweep_tunnels']} walls")
+
+    report = {
+        "commit": current_commit(),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "results": results,
+    }
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=1)
+        print()
+    elif args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"Wrote {len(results)} results to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# level_compiler.py
+# Compiles assets/levels.json into a compact binary cache. Wall rectangles
+# are deduplicated and merged into a smaller collision set and each level
+# gets a tile occupancy bitmap. The cache is memory-mapped on load and rebuilt whenever
+# the source JSON's hash no longer matches.
+import sys
+import json
+import hashlib
+import mmap
+import os
+import struct
+
+MAGIC = b"ECLV"
+VERSION = 1
+
+# magic, version, reserved, sha256 of the source, level count
+HEADER = struct.Struct("<4sHH32sI")
+OFFSET = struct.Struct("<Q")
+# width, height, player start x/y, exit x/y, wall/station/voidwalker counts
+LEVEL_HEADER = struct.Struct("<IIiiiiIII")
+WALL = struct.Struct("<iiii")
+POINT = struct.Struct("<ii")
+
+TILE_TO_DIGIT = bytes.maketrans(b"\x00\x01", b"01")
+BYTE_TO_TILES = [bytes((byte >> bit) & 1 for bit in range(8)) for byte in range(256)]
+
+DEFAULT_SOURCE = "assets/levels.json"
+DEFAULT_CACHE = "assets/levels.bin"
+
+def occupancy_rows(level):
+    # One bytearray per tile row, 1 where any wall covers the tile
+    width, height = level["width"], level["height"]
+    rows = [bytearray(width) for _ in range(height)]
+    for wall in level["walls"]:
+        x0 = max(wall["x"], 0)
+        x1 = min(wall["x"] + wall["width"], width)
+        if x1 <= x0:
+            continue
+        for y in range(max(wall["y"], 0), min(wall["y"] + wall["height"], height)):
+            rows[y][x0:x1] = b"\x01" * (x1 - x0)
+    return rows
+
+def dedupe_walls(level):
+    # The authored walls clipped to the map, without exact duplicates
+    width, height = level["width"], level["height"]
+    walls = []
+    seen = set()
+    for wall in level["walls"]:
+        x0, y0 = max(wall["x"], 0), max(wall["y"], 0)
+        x1 = min(wall["x"] + wall["width"], width)
+        y1 = min(wall["y"] + wall["height"], height)
+        rect = (x0, y0, x1 - x0, y1 - y0)
+        if x1 > x0 and y1 > y0 and rect not in seen:
+            seen.add(rect)
+            walls.append(rect)
+    return walls
+
+def merge_runs(rows):
+    # Non-overlapping cover: runs of blocked tiles in a row are extended
+    # downward while the row below has exactly the same run
+    walls = []
+    open_runs = {}
+    for y, row in enumerate(rows + [bytearray()]):
+        runs = []
+        x = 0
+        width = len(row)
+        while x < width:
+            if row[x]:
+                start = x
+                while x < width and row[x]:
+                    x += 1
+                runs.append((start, x))
+            else:
+                x += 1
+
+        next_open = {}
+        for run in runs:
+            next_open[run] = open_runs.pop(run, y)
+        for (x0, x1), top in open_runs.items():
+            walls.append((x0, top, x1 - x0, y - top))
+        open_runs = next_open
+    walls.sort(key=lambda wall: (wall[1], wall[0]))
+    return walls
+
+def merge_greedy(rows):
+    # Non-overlapping cover: take the first uncovered tile, grow right as far
+    # as the row allows, then grow down while the whole span stays blocked
+    height = len(rows)
+    width = len(rows[0]) if rows else 0
+    todo = [bytearray(row) for row in rows]
+    walls = []
+    for y in range(height):
+        row = todo[y]
+        x = 0
+        while x < width:
+            if not row[x]:
+                x += 1
+                continue
+            x1 = x
+            while x1 < width and row[x1]:
+                x1 += 1
+            span = b"\x01" * (x1 - x)
+            y1 = y + 1
+            while y1 < height and todo[y1][x:x1] == span:
+                y1 += 1
+            for covered in range(y, y1):
+                todo[covered][x:x1] = bytes(x1 - x)
+            walls.append((x, y, x1 - x, y1 - y))
+            x = x1
+    return walls
+
+def merge_walls(level, rows):
+    # Smallest of the candidate collision sets, preferring the authored
+    # walls on a tie. Overlapping authored walls can beat any non-overlapping
+    # cover (a cross needs two rects, not three).
+    candidates = [dedupe_walls(level), merge_runs(rows), merge_greedy(rows)]
+    return min(candidates, key=len)
+
+def pack_bitmap(rows, width):
+    # Row-major, each row padded to whole bytes, least significant bit first
+    row_bytes = (width + 7) // 8
+    bitmap = bytearray()
+    for row in rows:
+        # Reversed so tile 0 becomes the lowest bit of the binary literal
+        bits = int(bytes(row[::-1]).translate(TILE_TO_DIGIT) or b"0", 2)
+        bitmap += bits.to_bytes(row_bytes, "little")
+    return bytes(bitmap)
+
+def unpack_bitmap(bitmap, width, height):
+    # Back to one byte per tile, as Level's occupancy grid expects
+    row_bytes = (width + 7) // 8
+    tiles = bytearray()
+    for y in range(height):
+        row = bitmap[y * row_bytes:(y + 1) * row_bytes]
+        tiles += b"".join(BYTE_TO_TILES[byte] for byte in row)[:width]
+    return tiles
+
+def compile_level(level):
+    rows = occupancy_rows(level)
+    walls = merge_walls(level, rows)
+    stations = level["oxygen_stations"]
+    voidwalkers = level["voidwalkers"]
+
+    data = bytearray(LEVEL_HEADER.pack(
+        level["width"], level["height"],
+        level["player_start"]["x"], level["player_start"]["y"],
+        level["exit"]["x"], level["exit"]["y"],
+        len(walls), len(stations), len(voidwalkers)))
+    for wall in walls:
+        data += WALL.pack(*wall)
+    for point in stations + voidwalkers:
+        data += POINT.pack(point["x"], point["y"])
+    data += pack_bitmap(rows, level["width"])
+    return bytes(data)
+
+def compile_levels(source_bytes):
+    digest = hashlib.sha256(source_bytes).digest()
+    levels = json.loads(source_bytes)["levels"]
+    blocks = [compile_level(level) for level in levels]
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, 0, digest, len(blocks)))
+    offset = HEADER.size + OFFSET.size * len(blocks)
+    for block in blocks:
+        out += OFFSET.pack(offset)
+        offset += len(block)
+    for block in blocks:
+        out += block
+    return bytes(out)
+
+class CompiledLevels:
+    # Read-only view over a compiled cache; levels are decoded on access into
+    # the same dict layout as levels.json, plus an "occupancy" tile grid
+    def __init__(self, buffer):
+        self.buffer = buffer
+        magic, version, _, self.digest, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a compiled level cache of this version")
+        self.offsets = [OFFSET.unpack_from(buffer, HEADER.size + i * OFFSET.size)[0]
+                        for i in range(count)]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        buffer = self.buffer
+        offset = self.offsets[index]
+        (width, height, start_x, start_y, exit_x, exit_y,
+         wall_count, station_count, voidwalker_count) = LEVEL_HEADER.unpack_from(buffer, offset)
+        offset += LEVEL_HEADER.size
+
+        walls = []
+        for _ in range(wall_count):
+            x, y, w, h = WALL.unpack_from(buffer, offset)
+            walls.append({"x": x, "y": y, "width": w, "height": h})
+            offset += WALL.size
+        points = []
+        for _ in range(station_count + voidwalker_count):
+            x, y = POINT.unpack_from(buffer, offset)
+            points.append({"x": x, "y": y})
+            offset += POINT.size
+        bitmap_size = (width + 7) // 8 * height
+        bitmap = buffer[offset:offset + bitmap_size]
+
+        return {
+            "width": width,
+            "height": height,
+            "walls": walls,
+            "oxygen_stations": points[:station_count],
+            "voidwalkers": points[station_count:],
+            "player_start": {"x": start_x, "y": start_y},
+            "exit": {"x": exit_x, "y": exit_y},
+            "occupancy": unpack_bitmap(bitmap, width, height),
+        }
+
+def read_cache(cache_path, digest):
+    # Memory-mapped cache, or None when it is missing, stale or unreadable
+    try:
+        with open(cache_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        levels = CompiledLevels(buffer)
+    except (ValueError, struct.error):
+        buffer.close()
+        return None
+    if levels.digest != digest:
+        buffer.close()
+        return None
+    return levels
+
+def load_levels(source_path=DEFAULT_SOURCE, cache_path=DEFAULT_CACHE):
+    # Returns {"levels": CompiledLevels}, recompiling the cache if needed
+    with open(source_path, "rb") as f:
+        source_bytes = f.read()
+    digest = hashlib.sha256(source_bytes).digest()
+
+    levels = read_cache(cache_path, digest)
+    if levels is None:
+        compiled = compile_levels(source_bytes)
+        try:
+            temp_path = cache_path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(compiled)
+            os.replace(temp_path, cache_path)
+            levels = read_cache(cache_path, digest)
+        except OSError:
+            levels = None
+        if levels is None:
+            # Read-only install: keep the compiled bytes in memory instead
+            levels = CompiledLevels(compiled)
+    return {"levels": levels}
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOURCE
+    output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CACHE
+    with open(source, "rb") as f:
+        source_bytes = f.read()
+    compiled = compile_levels(source_bytes)
+    with open(output, "wb") as f:
+        f.write(compiled)
+
+    original = json.loads(source_bytes)["levels"]
+    levels = CompiledLevels(compiled)
+    for i, level in enumerate(original):
+        print(f"Level {i}: {len(level['walls'])} walls -> {len(levels[i]['walls'])}")
+    print(f"Wrote {len(compiled)} bytes to {output}")
@@ -1,21 +1,66 @@
 # main.py
+import time
+PROCESS_START = time.perf_counter()  # Origin for the startup report
+
 import sys
-import pygame
+import argparse
+import csv
 import json
+import threading
+import pygame
 import random
 import math
 import os
+import struct
+import zlib
+from array import array
+from collections import OrderedDict
 from enum import Enum
 
-# Initialize Pygame and its mixer
-pygame.init()
-pygame.mixer.init()
+import level_compiler
+import recording
+import snapshot
+
+# NumPy is optional; without it every Voidwalker updates itself
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+IMPORTS_DONE = time.perf_counter()
 
 # Constants
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
 TILE_SIZE = 32
 FPS = 60
+FIXED_DT = 1.0 / FPS  # Simulation step, independent of the render rate
+MAX_FRAME_TIME = 0.25  # Cap on real time fed to the simulation per frame
+STATIC_CHUNK_SIZE = 512  # Pixel size of the pre-rendered level chunks
+ENTITY_CELL_SIZE = TILE_SIZE * 4  # Grid cell for moving entities
+FLOW_FIELD_RADIUS = 24  # Tiles the chase flow field reaches out from the player
+SWARM_THRESHOLD = 64  # Voidwalker count at which the NumPy batch update kicks in
+AI_NEAR_RANGE = 400  # Voidwalkers this close to the player update every tick
+AI_MID_RANGE = 1200  # Up to here they update every AI_MID_INTERVAL ticks
+AI_MID_INTERVAL = 4
+AI_FAR_INTERVAL = 16  # Ticks between updates for the rest
+AI_VIEW_MARGIN = 128  # Voidwalkers this close to the screen update every tick
+AI_TICK_BUDGET = 64  # Most reduced-rate voidwalker updates run in one tick
+LEVEL_CHUNK_TILES = 32  # Side of a streamed level region, in tiles
+MAX_RESIDENT_CHUNKS = 25  # LRU bound on loaded regions for streamed levels
+STREAM_MARGIN = LEVEL_CHUNK_TILES * TILE_SIZE // 2  # Preload distance around the camera
+PROFILE_FRAMES = 600  # Frames kept by the frame profiler (10 seconds at 60 FPS)
+AUDIO_CHANNELS = 8  # Mixer voices shared by every sound effect
+AUDIO_FREQUENCY = 44100  # Sample rate every sound is converted to
+IDLE_WAIT_MS = 250  # Longest sleep between checks while waiting for input on a static screen
+HUD_HEIGHT = 40  # Screen band the HUD draws into
+SNAPSHOT_INTERVAL = 6  # Ticks between rewind snapshots
+REWIND_BUFFER_BYTES = 1 << 20  # Memory for rewind history; longer on levels with fewer voidwalkers
+REWIND_STEP = 1.0  # Seconds one BACKSPACE press goes back
+RENDER_SCALES = (1.0, 0.5)  # Internal world resolutions, as fractions of the window; whole-number upscales stay cheap
+RENDER_BUDGET = 0.8 / FPS  # Mean frame time above which adaptive resolution steps down
+RENDER_HEADROOM = 0.4  # ...and the fraction of the budget below which it steps back up
+RENDER_ADAPT_FRAMES = 120  # Frames averaged per adaptive resolution decision
 
 # Colors
 BLACK = (0, 0, 0)
@@ -31,6 +76,23 @@ HARD_DISTANCE = 4000  # New hard level
 EXPERT_DISTANCE = 6000  # New expert level
 MASTER_DISTANCE = 8500  # New master level
 
+# Sound effects: path, cooldown in seconds, max simultaneous voices, priority
+SOUNDS = {
+    "collect": ("assets/collect.wav", 0.4, 1, 1),
+    "damage": ("assets/damage.wav", 0.1, 2, 2),
+}
+MUSIC = "assets/background_music.mp3"
+
+# Different messages based on death type
+DEATH_MESSAGES = {
+    "oxygen": [
+        "Oops! Forgot to breathe?"
+    ],
+    "voidwalker": [
+        "Voidwalker just wanted a hug!"
+    ],
+}
+
 class GameState(Enum):
     MENU = 1
     PLAYING = 2
@@ -44,49 +106,454 @@ class Direction(Enum):
     UP = 3
     DOWN = 4
 
+class SpatialHash:
+    def __init__(self, cell_size=TILE_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.object_cells = {}
+
+    def cell_range(self, rect):
+        # Cells covered by the rect; touching edges don't count as overlap
+        cs = self.cell_size
+        return (rect.left // cs, rect.top // cs,
+                (rect.right - 1) // cs, (rect.bottom - 1) // cs)
+
+    def insert(self, obj, rect):
+        x0, y0, x1, y1 = self.cell_range(rect)
+        keys = []
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                self.cells.setdefault((cx, cy), []).append(obj)
+                keys.append((cx, cy))
+        self.object_cells[obj] = (x0, y0, x1, y1, keys)
+
+    def remove(self, obj):
+        entry = self.object_cells.pop(obj, None)
+        if entry is None:
+            return
+        for key in entry[4]:
+            bucket = self.cells[key]
+            bucket.remove(obj)
+            if not bucket:
+                del self.cells[key]
+
+    def update(self, obj, rect):
+        # Only touch the buckets when the object actually changes cells
+        entry = self.object_cells.get(obj)
+        if entry is not None and entry[:4] == self.cell_range(rect):
+            return
+        self.remove(obj)
+        self.insert(obj, rect)
+
+    def query(self, rect):
+        x0, y0, x1, y1 = self.cell_range(rect)
+        found = []
+        seen = set()
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            # Large query over a sparse grid: walk the occupied cells instead
+            for (cx, cy), bucket in self.cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    for obj in bucket:
+                        if obj not in seen:
+                            seen.add(obj)
+                            found.append(obj)
+            return found
+        cells = self.cells
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    for obj in bucket:
+                        if obj not in seen:
+                            seen.add(obj)
+                            found.append(obj)
+        return found
+
+class AssetCache:
+    # Process-wide registry of decoded and scaled surfaces. Every entity using
+    # the same sheet shares one frame list and only keeps its own cursor.
+    # Mirrored (left-facing) frames are made once alongside the originals.
+    # Levels are also built on worker threads (see LevelPrefetcher), so a
+    # miss is filled under a lock to decode each sheet only once.
+    images = {}
+    frames = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def get_image(cls, image_path, scale=1):
+        key = (image_path, None, scale)
+        image = cls.images.get(key)
+        if image is None:
+            with cls.lock:
+                image = cls.images.get(key)
+                if image is None:
+                    original = pygame.image.load(image_path).convert_alpha()
+                    image = pygame.transform.scale(original,
+                        (original.get_width() * scale, original.get_height() * scale))
+                    cls.images[key] = image
+        return image
+
+    @classmethod
+    def get_frames(cls, sprite_sheet_path, frame_width, frame_height, scale=1, flipped=False):
+        key = (sprite_sheet_path, (frame_width, frame_height), scale)
+        frame_sets = cls.frames.get(key)
+        if frame_sets is None:
+            with cls.lock:
+                frame_sets = cls.frames.get(key)
+                if frame_sets is None:
+                    sprite_sheet = pygame.image.load(sprite_sheet_path).convert_alpha()
+                    frames = tuple(
+                        pygame.transform.scale(frame, (frame_width * scale, frame_height * scale))
+                        for frame in cls.split_sprite_sheet(sprite_sheet, frame_width, frame_height))
+                    mirrored = tuple(pygame.transform.flip(frame, True, False) for frame in frames)
+                    frame_sets = (frames, mirrored)
+                    cls.frames[key] = frame_sets
+        return frame_sets[1] if flipped else frame_sets[0]
+
+    @staticmethod
+    def split_sprite_sheet(sprite_sheet, frame_width, frame_height):
+        frames = []
+        sheet_width = sprite_sheet.get_width()
+        sheet_height = sprite_sheet.get_height()
+        
+        for y in range(0, sheet_height, frame_height):
+            for x in range(0, sheet_width, frame_width):
+                frame = sprite_sheet.subsurface((x, y, frame_width, frame_height))
+                frames.append(frame)
+        return frames
+
+    @classmethod
+    def clear(cls):
+        cls.images.clear()
+        cls.frames.clear()
+
+class TextCache:
+    # Rendered text surfaces keyed by content; a string is only rendered
+    # again when it changes, and the least recently used ones are dropped
+    def __init__(self, font, max_entries=64):
+        self.font = font
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def render(self, text, color=WHITE):
+        key = (text, color)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            return surface
+        
+        surface = self.font.render(text, True, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+class StartupTimer:
+    # Where startup time goes, per phase and thread. Phases are recorded as
+    # (label, thread, start offset, duration) in milliseconds.
+    def __init__(self, origin=PROCESS_START):
+        self.origin = origin
+        self.phases = []
+        self.lock = threading.Lock()
+        self.record("imports", origin, IMPORTS_DONE)
+
+    def record(self, label, start, end=None):
+        if end is None:
+            end = time.perf_counter()
+        phase = (label, threading.current_thread().name,
+                 (start - self.origin) * 1000, (end - start) * 1000)
+        with self.lock:
+            self.phases.append(phase)
+
+    def report(self):
+        lines = ["Startup timing (ms since main.py started):"]
+        with self.lock:
+            phases = sorted(self.phases, key=lambda phase: phase[2])
+        for label, thread, offset, duration in phases:
+            lines.append(f"  {offset:8.1f} +{duration:7.1f}  {label:<24} [{thread}]")
+        return "\n".join(lines)
+
+class FrameProfiler:
+    # Per-phase frame timings and entity counts for the last `capacity`
+    # frames, kept in preallocated ring buffers so recording never allocates.
+    # Times are stored in seconds; the overlay and exports use milliseconds.
+    PHASES = ("events", "input", "player", "voidwalkers", "stations", "exit", "draw", "flip")
+    COUNTS = ("steps", "voidwalkers", "oxygen_stations", "walls", "drawn_voidwalkers")
+    GRAPH_SIZE = (240, 80)
+    GRAPH_CEILING = 2.0 / FPS  # Frame time at the top of the graph
+
+    def __init__(self, capacity=PROFILE_FRAMES):
+        self.capacity = capacity
+        self.phase_index = {name: i for i, name in enumerate(self.PHASES)}
+        # One row per frame: every phase, then the whole frame
+        self.row_size = len(self.PHASES) + 1
+        self.times = array("d", bytes(8 * capacity * self.row_size))
+        self.counts = array("l", bytes(array("l").itemsize * capacity * len(self.COUNTS)))
+        self.current = [0.0] * len(self.PHASES)
+        self.steps = 0
+        self.frame_start = time.perf_counter()
+        self.frames = 0  # Frames recorded so far, including overwritten ones
+        self.last_frame = 0.0
+        self.show_overlay = False
+        self.font = None
+        self.labels = ()
+
+    def begin_frame(self):
+        for i in range(len(self.current)):
+            self.current[i] = 0.0
+        self.steps = 0
+        self.frame_start = time.perf_counter()
+
+    def add(self, phase, start):
+        # Charges the time since `start` to a phase and returns the current
+        # time, so consecutive phases can be chained off one timestamp
+        now = time.perf_counter()
+        self.current[self.phase_index[phase]] += now - start
+        return now
+
+    def end_frame(self, counts):
+        slot = self.frames % self.capacity
+        base = slot * self.row_size
+        times = self.times
+        for i, value in enumerate(self.current):
+            times[base + i] = value
+        self.last_frame = time.perf_counter() - self.frame_start
+        times[base + len(self.current)] = self.last_frame
+        base = slot * len(self.COUNTS)
+        self.counts[base] = self.steps
+        for i, value in enumerate(counts):
+            self.counts[base + 1 + i] = value
+        self.frames += 1
+
+    def recorded(self):
+        # Ring slots of the stored frames, oldest first
+        stored = min(self.frames, self.capacity)
+        first = self.frames - stored
+        return [(first + i) % self.capacity for i in range(stored)]
+
+    def column(self, index, slots=None):
+        if slots is None:
+            slots = self.recorded()
+        return [self.times[slot * self.row_size + index] for slot in slots]
+
+    def frame_times(self, slots=None):
+        return self.column(len(self.PHASES), slots)
+
+    @staticmethod
+    def percentile(values, fraction):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def summary(self):
+        # p50/p99/max in milliseconds for the frame and each phase
+        slots = self.recorded()
+        names = self.PHASES + ("frame",)
+        result = {}
+        for i, name in enumerate(names):
+            values = self.column(i, slots)
+            result[name] = {
+                "p50": round(self.percentile(values, 0.5) * 1000, 4),
+                "p99": round(self.percentile(values, 0.99) * 1000, 4),
+                "max": round(max(values, default=0.0) * 1000, 4),
+            }
+        return result
+
+    def rows(self):
+        # One dict per stored frame, oldest first
+        names = self.PHASES + ("frame",)
+        first = self.frames - min(self.frames, self.capacity)
+        for n, slot in enumerate(self.recorded()):
+            row = {"frame": first + n}
+            base = slot * self.row_size
+            for i, name in enumerate(names):
+                row[name + "_ms"] = round(self.times[base + i] * 1000, 4)
+            base = slot * len(self.COUNTS)
+            for i, name in enumerate(self.COUNTS):
+                row[name] = self.counts[base + i]
+            yield row
+
+    def export(self, path):
+        # CSV for .csv paths, JSON (with a summary) for anything else
+        rows = list(self.rows())
+        if path.lower().endswith(".csv"):
+            fields = (["frame"] + [name + "_ms" for name in self.PHASES + ("frame",)]
+                      + list(self.COUNTS))
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(path, "w") as f:
+                json.dump({"summary": self.summary(), "frames": rows}, f, indent=1)
+
+    def draw_overlay(self, surface):
+        width, height = self.GRAPH_SIZE
+        left = WINDOW_WIDTH - width - 10
+        top = WINDOW_HEIGHT - height - 10
+        panel = pygame.Rect(left, top - 40, width, height + 40)
+        pygame.draw.rect(surface, BLACK, panel)
+        pygame.draw.rect(surface, WHITE, panel, 1)
+        
+        # One column per recent frame, scaled so the budget line sits mid-graph
+        slots = self.recorded()
+        frame_times = self.frame_times(slots[-width:])
+        bottom = top + height
+        for x, frame_time in enumerate(frame_times):
+            bar = min(frame_time / self.GRAPH_CEILING, 1.0) * height
+            color = GREEN if frame_time <= 1.0 / FPS else RED
+            pygame.draw.line(surface, color, (left + x, bottom), (left + x, bottom - bar))
+        budget_y = bottom - height * (1.0 / FPS) / self.GRAPH_CEILING
+        pygame.draw.line(surface, BLUE, (left, budget_y), (left + width - 1, budget_y))
+        
+        # The text only changes a few times a second
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+        if self.frames % 15 == 0 or not self.labels:
+            frame_times = self.frame_times(slots)
+            last = slots[-1] * self.row_size if slots else 0
+            worst = max(range(len(self.PHASES)), key=lambda i: self.times[last + i])
+            self.labels = (
+                self.font.render(f"frame p50 {self.percentile(frame_times, 0.5) * 1000:.2f} ms"
+                                 f"  p99 {self.percentile(frame_times, 0.99) * 1000:.2f} ms",
+                                 True, WHITE),
+                self.font.render(f"slowest phase: {self.PHASES[worst]} "
+                                 f"{self.times[last + worst] * 1000:.2f} ms", True, WHITE),
+            )
+        for i, label in enumerate(self.labels):
+            surface.blit(label, (left + 4, top - 36 + i * 16))
+        return panel
+
+class AudioManager:
+    # Owns a fixed pool of mixer channels. Every sound has a cooldown, a cap
+    # on voices playing at once and a priority: when the pool is full the
+    # oldest voice of a lower priority is stolen, otherwise the new sound is
+    # dropped. The mixer runs at one sample format, so sounds are converted
+    # to it once when loaded. Without an audio device it all becomes a no-op.
+    sounds = {}  # Decoded sounds, shared by every manager
+
+    def __init__(self, channels=AUDIO_CHANNELS, enabled=True):
+        self.channel_count = channels
+        self.enabled = enabled
+        self.channels = []
+        self.voices = []  # (name, priority, start time) per channel
+        self.specs = {}
+        self.last_played = {}
+        self.music_path = None
+
+    def init(self):
+        if not self.enabled:
+            return
+        try:
+            pygame.mixer.init(frequency=AUDIO_FREQUENCY, size=-16, channels=2, buffer=512)
+        except pygame.error:
+            # No usable audio device; play silently
+            self.enabled = False
+            return
+        pygame.mixer.set_num_channels(self.channel_count)
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.channel_count)]
+        self.voices = [None] * self.channel_count
+
+    def load(self, name, path, cooldown=0.0, max_voices=1, priority=0, volume=1.0):
+        self.specs[name] = (path, cooldown, max_voices, priority, volume)
+        self.last_played[name] = -cooldown
+        if not self.enabled:
+            return
+        sound = self.sounds.get(path)
+        if sound is None:
+            sound = pygame.mixer.Sound(path)
+            self.sounds[path] = sound
+
+    def play(self, name):
+        # Returns the channel the sound went to, or None if it was throttled
+        if not self.enabled:
+            return None
+        path, cooldown, max_voices, priority, volume = self.specs[name]
+        now = time.perf_counter()
+        if now - self.last_played[name] < cooldown:
+            return None
+        
+        free = None
+        victim = None
+        playing = 0
+        for i, channel in enumerate(self.channels):
+            voice = self.voices[i]
+            if voice is None or not channel.get_busy():
+                self.voices[i] = None
+                if free is None:
+                    free = i
+                continue
+            if voice[0] == name:
+                playing += 1
+            elif voice[1] < priority and (victim is None or
+                                          (voice[1], voice[2]) < self.voices[victim][1:]):
+                victim = i
+        if playing >= max_voices:
+            return None
+        index = free if free is not None else victim
+        if index is None:
+            return None
+        
+        channel = self.channels[index]
+        channel.set_volume(volume)
+        channel.play(self.sounds[path])
+        self.voices[index] = (name, priority, now)
+        self.last_played[name] = now
+        return channel
+
+    def play_music(self, path, loops=-1):
+        # Keeps playing if the same track is already on
+        if not self.enabled:
+            return
+        if path == self.music_path and pygame.mixer.music.get_busy():
+            return
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.play(loops)
+        self.music_path = path
+
+    def stop_music(self):
+        if self.enabled:
+            pygame.mixer.music.stop()
+        self.music_path = None
+
 class Sprite:
     def __init__(self, image_path, scale=1):
-        self.original_image = pygame.image.load(image_path).convert_alpha()
-        self.image = pygame.transform.scale(self.original_image, 
-            (self.original_image.get_width() * scale,
-             self.original_image.get_height() * scale))
+        self.image_path = image_path
+        self.scale = scale
+        self.image = AssetCache.get_image(image_path, scale)
         self.rect = self.image.get_rect()
 
+    def blit_item(self, x, y, render_scale=1):
+        # (surface, rect) for Surface.blits; the rect rounds x and y. Below
+        # a render scale of 1 the position and image are scaled down with it.
+        self.rect.x = x * render_scale
+        self.rect.y = y * render_scale
+        if render_scale != 1:
+            return AssetCache.get_image(self.image_path, self.scale * render_scale), self.rect
+        return self.image, self.rect
+
     def draw(self, surface, x, y):
-        self.rect.x = x
-        self.rect.y = y
-        surface.blit(self.image, self.rect)
+        surface.blit(*self.blit_item(x, y))
 
 class AnimatedSprite(Sprite):
     def __init__(self, sprite_sheet_path, frame_width, frame_height, scale=1):
-        self.sprite_sheet = pygame.image.load(sprite_sheet_path).convert_alpha()
+        self.sheet_path = sprite_sheet_path
         self.frame_width = frame_width
         self.frame_height = frame_height
-        self.frames = self.split_sprite_sheet()
+        self.scale = scale
+        # Shared, already scaled frames; only the animation cursor is per entity
+        self.frames = AssetCache.get_frames(sprite_sheet_path, frame_width,
+                                            frame_height, scale)
+        self.flipped_frames = AssetCache.get_frames(sprite_sheet_path, frame_width,
+                                                    frame_height, scale, flipped=True)
         self.current_frame = 0
         self.animation_speed = 0.2
         self.animation_timer = 0
-        self.scale = scale
-        
-        # Scale frames
-        for i in range(len(self.frames)):
-            self.frames[i] = pygame.transform.scale(self.frames[i],
-                (frame_width * scale, frame_height * scale))
         
         self.image = self.frames[0]
         self.rect = self.image.get_rect()
 
-    def split_sprite_sheet(self):
-        frames = []
-        sheet_width = self.sprite_sheet.get_width()
-        sheet_height = self.sprite_sheet.get_height()
-        
-        for y in range(0, sheet_height, self.frame_height):
-            for x in range(0, sheet_width, self.frame_width):
-                frame = self.sprite_sheet.subsurface((x, y, self.frame_width, self.frame_height))
-                frames.append(frame)
-        return frames
-
     def update(self, dt):
         self.animation_timer += dt
         if self.animation_timer >= self.animation_speed:
@@ -94,10 +561,19 @@ class AnimatedSprite(Sprite):
             self.current_frame = (self.current_frame + 1) % len(self.frames)
             self.image = self.frames[self.current_frame]
 
-    def draw(self, surface, x, y):
-        self.rect.x = x
-        self.rect.y = y
-        surface.blit(self.image, self.rect)
+    def blit_item(self, x, y, facing_left=False, render_scale=1):
+        self.rect.x = x * render_scale
+        self.rect.y = y * render_scale
+        if render_scale != 1:
+            frames = AssetCache.get_frames(self.sheet_path, self.frame_width, self.frame_height,
+                                           self.scale * render_scale, facing_left)
+            return frames[self.current_frame], self.rect
+        if facing_left:
+            return self.flipped_frames[self.current_frame], self.rect
+        return self.image, self.rect
+
+    def draw(self, surface, x, y, facing_left=False):
+        surface.blit(*self.blit_item(x, y, facing_left))
 
 class Player:
     def __init__(self, x, y):
@@ -113,35 +589,12 @@ class Player:
         self.rect = pygame.Rect(x, y, self.width, self.height)
         self.items = []
 
-    def move(self, dx, dy, dt, walls):
-        new_x = self.x + dx * self.speed * dt
-        new_y = self.y + dy * self.speed * dt
-        
-        # Create temporary rectangles for collision testing
-        temp_rect_x = pygame.Rect(new_x, self.y, self.width, self.height)
-        temp_rect_y = pygame.Rect(self.x, new_y, self.width, self.height)
-        
-        # Check horizontal movement
-        can_move_x = True
-        for wall in walls:
-            if temp_rect_x.colliderect(wall.rect):
-                can_move_x = False
-                break
-        
-        # Check vertical movement
-        can_move_y = True
-        for wall in walls:
-            if temp_rect_y.colliderect(wall.rect):
-                can_move_y = False
-                break
-        
-        # Update position if movement is valid
-        if can_move_x:
-            self.x = new_x
-        if can_move_y:
-            self.y = new_y
-            
-        # Update rectangle position
+    def move(self, dx, dy, dt, level):
+        # Swept against the walls: a long step stops where it first touches
+        # a wall and slides along it instead of skipping the move or passing
+        # through
+        self.x, self.y, _, _ = level.sweep(self.x, self.y, self.width, self.height,
+                                           dx * self.speed * dt, dy * self.speed * dt)
         self.rect.x = self.x
         self.rect.y = self.y
         
@@ -157,20 +610,21 @@ class Player:
             self.oxygen = 0
         self.sprite.update(dt)
 
+    def blit_item(self, camera_x, camera_y, render_scale=1):
+        # Pre-flipped frame when facing left
+        return self.sprite.blit_item(self.x - camera_x, self.y - camera_y,
+                                     self.direction == Direction.LEFT, render_scale)
+
     def draw(self, surface, camera_x, camera_y):
-        screen_x = self.x - camera_x
-        screen_y = self.y - camera_y
-        
-        # Flip sprite based on direction
-        if self.direction == Direction.LEFT:
-            flipped_image = pygame.transform.flip(self.sprite.image, True, False)
-            surface.blit(flipped_image, (screen_x, screen_y))
-        else:
-            self.sprite.draw(surface, screen_x, screen_y)
+        surface.blit(*self.blit_item(camera_x, camera_y))
 
 class Voidwalker:
+    FRAME_SIZE = 32
+    SCALE = 1.5
+
     def __init__(self, x, y):
-        self.sprite = AnimatedSprite("assets/voidwalker_sprite.png", 32, 32, 1.5)
+        self.sprite = AnimatedSprite("assets/voidwalker_sprite.png",
+                                     self.FRAME_SIZE, self.FRAME_SIZE, self.SCALE)
         self.x = x
         self.y = y
         self.width = self.sprite.frame_width * self.sprite.scale
@@ -187,6 +641,12 @@ class Voidwalker:
         self.attack_cooldown = 0
         self.can_teleport = True
         self.teleport_cooldown = 0
+        # Set by AIScheduler
+        self.next_update = 0
+        self.update_interval = 1
+        self.last_update_tick = 0
+        self.last_update_time = 0.0
+        self.order = 0  # Position in the level's list
 
     def patrol(self, dt):
         if self.moving_right:
@@ -202,35 +662,38 @@ class Voidwalker:
             else:
                 self.moving_right = True
 
-    def chase_player(self, player, dt, walls):
-        dx = player.x - self.x
-        dy = player.y - self.y
+    def chase_player(self, player, dt, level):
+        # Follow the level's flow field around walls toward the player
+        target_x, target_y = level.chase_target(self.x, self.y, player.x, player.y)
+        dx = target_x - self.x
+        dy = target_y - self.y
         distance = math.sqrt(dx**2 + dy**2)
         
         if distance != 0:
             dx = dx / distance
             dy = dy / distance
             
-            # Test movement for collision
-            new_x = self.x + dx * self.speed * dt
-            new_y = self.y + dy * self.speed * dt
-            
-            temp_rect_x = pygame.Rect(new_x, self.y, self.width, self.height)
-            temp_rect_y = pygame.Rect(self.x, new_y, self.width, self.height)
-            
-            can_move_x = True
-            can_move_y = True
-            
-            for wall in walls:
-                if temp_rect_x.colliderect(wall.rect):
-                    can_move_x = False
-                if temp_rect_y.colliderect(wall.rect):
-                    can_move_y = False
+            step = self.speed * dt
+            if distance <= step:
+                # Land exactly on the waypoint instead of overshooting it
+                move_x, move_y = target_x - self.x, target_y - self.y
+            else:
+                move_x, move_y = dx * step, dy * step
+            x, y, hit_x, hit_y = level.sweep(self.x, self.y, self.width, self.height,
+                                             move_x, move_y)
             
-            if can_move_x:
-                self.x = new_x
-            if can_move_y:
-                self.y = new_y
+            # Blocked on one axis only: spend the rest of the step on the
+            # free one so the walker slides along the wall toward its
+            # waypoint instead of creeping up on it
+            left = step - math.hypot(x - self.x, y - self.y)
+            if left > 0 and hit_x and not hit_y and dy != 0:
+                x, y, _, _ = level.sweep(x, y, self.width, self.height,
+                                         0, math.copysign(min(abs(target_y - y), left), dy))
+            elif left > 0 and hit_y and not hit_x and dx != 0:
+                x, y, _, _ = level.sweep(x, y, self.width, self.height,
+                                         math.copysign(min(abs(target_x - x), left), dx), 0)
+            self.x = x
+            self.y = y
                 
             if dx > 0:
                 self.direction = Direction.RIGHT
@@ -242,7 +705,7 @@ class Voidwalker:
             # Implement special attacks
             self.attack_cooldown = 3.0  # Cooldown in seconds
 
-    def update(self, player, dt, walls):
+    def update(self, player, dt, level):
         # Calculate distance to player
         dx = player.x - self.x
         dy = player.y - self.y
@@ -252,7 +715,7 @@ class Voidwalker:
         if distance <= self.detection_range:
             self.chase_mode = True
             self.speed = self.original_speed * 1.5
-            self.chase_player(player, dt, walls)
+            self.chase_player(player, dt, level)
         else:
             self.chase_mode = False
             self.speed = self.original_speed
@@ -262,15 +725,342 @@ class Voidwalker:
         self.rect.y = self.y
         self.sprite.update(dt)
 
+    def blit_item(self, camera_x, camera_y, render_scale=1):
+        return self.sprite.blit_item(self.x - camera_x, self.y - camera_y,
+                                     self.direction == Direction.LEFT, render_scale)
+
     def draw(self, surface, camera_x, camera_y):
-        screen_x = self.x - camera_x
-        screen_y = self.y - camera_y
+        surface.blit(*self.blit_item(camera_x, camera_y))
+
+class AIScheduler:
+    # Voidwalker level of detail. Walkers that are chasing, near the player
+    # or on (or about to come on) screen update every tick. Farther ones
+    # update every AI_MID_INTERVAL or AI_FAR_INTERVAL ticks and are handed
+    # the time since their last update. At most AI_TICK_BUDGET of these
+    # reduced-rate updates run in a tick; the rest slip to the next one.
+    # Which ones go first depends only on the walkers' own state (see
+    # budget_key), so the swarm picks the same ones and a restored snapshot
+    # carries on the same way.
+    # The schedule lives on the voidwalkers (VoidwalkerSwarm keeps it in
+    # arrays); for the object path, walkers also wait in per-tick buckets so
+    # a tick only touches the ones due.
+    def __init__(self):
+        self.tick = 0
+        self.clock = 0.0
+        self.buckets = {}
+
+    def add(self, voidwalker):
+        # New walkers are looked at on the next tick, whatever the budget
+        voidwalker.next_update = self.tick + 1
+        voidwalker.update_interval = 1
+        voidwalker.last_update_tick = self.tick
+        voidwalker.last_update_time = self.clock
+
+    def index(self, voidwalkers):
+        # Refills the buckets after the resident set changes. Walkers held
+        # back by the budget keep their next_update and are due next tick.
+        self.buckets = {}
+        for i, voidwalker in enumerate(voidwalkers):
+            voidwalker.order = i
+            self.buckets.setdefault(max(voidwalker.next_update, self.tick + 1), []).append(voidwalker)
+
+    @staticmethod
+    def budget_key(voidwalker):
+        # Longest overdue first, then the longest since its last update,
+        # then level order; VoidwalkerSwarm.due sorts the same way
+        return (voidwalker.next_update, voidwalker.last_update_tick, voidwalker.order)
+
+    def advance(self, dt):
+        self.tick += 1
+        self.clock += dt
+
+    def due(self, dt):
+        # (voidwalker, elapsed time) for every bucketed walker to update this tick
+        tick = self.tick
+        bucket = self.buckets.pop(tick, ())
+        deferred = ()
+        staggered = [voidwalker for voidwalker in bucket if voidwalker.update_interval > 1]
+        if len(staggered) > AI_TICK_BUDGET:
+            staggered.sort(key=self.budget_key)
+            deferred = set(staggered[AI_TICK_BUDGET:])
+            self.buckets.setdefault(tick + 1, []).extend(staggered[AI_TICK_BUDGET:])
+        due = []
+        for voidwalker in bucket:
+            if voidwalker in deferred:
+                continue
+            # Exactly dt for walkers updated every tick
+            if voidwalker.last_update_tick == tick - 1:
+                elapsed = dt
+            else:
+                elapsed = self.clock - voidwalker.last_update_time
+            voidwalker.last_update_tick = tick
+            voidwalker.last_update_time = self.clock
+            due.append((voidwalker, elapsed))
+        return due
+
+    @staticmethod
+    def interval(x, y, chasing, player, view):
+        # Ticks until the next update; view is the camera rect grown by
+        # AI_VIEW_MARGIN. VoidwalkerSwarm.reschedule is the batch version.
+        dx = x - player.x
+        dy = y - player.y
+        distance_sq = dx * dx + dy * dy
+        if chasing or distance_sq <= AI_NEAR_RANGE ** 2 or view.collidepoint(x, y):
+            return 1
+        if distance_sq <= AI_MID_RANGE ** 2:
+            return AI_MID_INTERVAL
+        return AI_FAR_INTERVAL
+
+    def schedule(self, voidwalker, interval):
+        voidwalker.update_interval = interval
+        voidwalker.next_update = self.tick + interval
+        self.buckets.setdefault(voidwalker.next_update, []).append(voidwalker)
+
+class VoidwalkerSwarm:
+    # Structure-of-arrays update for large voidwalker populations. Detection,
+    # patrol stepping, animation and the player hit test run as one NumPy
+    # pass per tick; only chasing voidwalkers (a handful near the player)
+    # fall back to Voidwalker.chase_player for their wall collisions.
+    # The Voidwalker objects are written back lazily through sync().
+    # Snapshot records as a NumPy view, field for field snapshot.WALKER
+    RECORD = (np.dtype([(name, "<" + code) for name, code in snapshot.WALKER_FIELDS])
+              if np is not None else None)
+
+    def __init__(self, voidwalkers, grid):
+        # Its own list: the level appends newly loaded walkers to its list
+        # before replacing the swarm, and sync() must only see these
+        self.voidwalkers = list(voidwalkers)
+        self.grid = grid
+        self.index = {voidwalker: i for i, voidwalker in enumerate(voidwalkers)}
         
-        if self.direction == Direction.LEFT:
-            flipped_image = pygame.transform.flip(self.sprite.image, True, False)
-            surface.blit(flipped_image, (screen_x, screen_y))
-        else:
-            self.sprite.draw(surface, screen_x, screen_y)
+        def column(attr, dtype=np.float64):
+            return np.array([getattr(v, attr) for v in voidwalkers], dtype=dtype)
+        
+        self.x = column("x")
+        self.y = column("y")
+        self.width = column("width")
+        self.height = column("height")
+        self.patrol_a = column("patrol_point_a")
+        self.patrol_b = column("patrol_point_b")
+        self.original_speed = column("original_speed")
+        self.speed = column("speed")
+        self.detection_range = column("detection_range")
+        self.moving_right = column("moving_right", bool)
+        self.chase_mode = column("chase_mode", bool)
+        self.next_update = column("next_update", np.int64)
+        self.update_interval = column("update_interval", np.int64)
+        self.last_update_tick = column("last_update_tick", np.int64)
+        self.last_update_time = column("last_update_time")
+        self.attack_cooldown = column("attack_cooldown")
+        self.teleport_cooldown = column("teleport_cooldown")
+        self.can_teleport = column("can_teleport", bool)
+        self.facing_left = np.array([v.direction == Direction.LEFT for v in voidwalkers],
+                                    dtype=bool)
+        
+        sprites = [v.sprite for v in voidwalkers]
+        self.anim_timer = np.array([s.animation_timer for s in sprites], dtype=np.float64)
+        self.anim_speed = np.array([s.animation_speed for s in sprites], dtype=np.float64)
+        self.anim_frame = np.array([s.current_frame for s in sprites], dtype=np.int64)
+        self.frame_count = np.array([len(s.frames) for s in sprites], dtype=np.int64)
+        
+        self.rect_w = np.array([v.rect.width for v in voidwalkers], dtype=np.int64)
+        self.rect_h = np.array([v.rect.height for v in voidwalkers], dtype=np.int64)
+        self.rect_x, self.rect_y = self.rounded_position()
+        self.cells = self.cell_ranges()
+
+    @staticmethod
+    def round_half_away(values):
+        # pygame.Rect rounds assigned floats half away from zero
+        whole = np.trunc(values)
+        frac = values - whole
+        return (whole + np.where(np.abs(frac) >= 0.5, np.sign(values), 0)).astype(np.int64)
+
+    def rounded_position(self):
+        return self.round_half_away(self.x), self.round_half_away(self.y)
+
+    def cell_ranges(self, rect_x=None, rect_y=None, rect_w=None, rect_h=None):
+        if rect_x is None:
+            rect_x, rect_y, rect_w, rect_h = self.rect_x, self.rect_y, self.rect_w, self.rect_h
+        cs = self.grid.cell_size
+        return np.stack((rect_x // cs, rect_y // cs,
+                         (rect_x + rect_w - 1) // cs,
+                         (rect_y + rect_h - 1) // cs), axis=1)
+
+    def due(self, ai, dt):
+        # AIScheduler.due over the arrays: indices of the walkers to update
+        # this tick and the time each has to make up
+        tick = ai.tick
+        pending = self.next_update <= tick
+        staggered = pending & (self.update_interval > 1)
+        if np.count_nonzero(staggered) > AI_TICK_BUDGET:
+            # In AIScheduler.budget_key order; the rest slip a tick
+            waiting = np.flatnonzero(staggered)
+            order = np.lexsort((waiting, self.last_update_tick[waiting], self.next_update[waiting]))
+            pending[waiting[order[AI_TICK_BUDGET:]]] = False
+        idx = np.flatnonzero(pending)
+        elapsed = np.where(self.last_update_tick[idx] == tick - 1, dt,
+                           ai.clock - self.last_update_time[idx])
+        self.last_update_tick[idx] = tick
+        self.last_update_time[idx] = ai.clock
+        return idx, elapsed
+
+    def reschedule(self, idx, ai, player, view):
+        # AIScheduler.interval for the walkers just updated
+        x = self.x[idx]
+        y = self.y[idx]
+        dx = x - player.x
+        dy = y - player.y
+        distance_sq = dx * dx + dy * dy
+        # Rect.collidepoint excludes the right and bottom edges
+        visible = (x >= view.left) & (x < view.right) & (y >= view.top) & (y < view.bottom)
+        near = self.chase_mode[idx] | (distance_sq <= AI_NEAR_RANGE ** 2) | visible
+        interval = np.where(near, 1, np.where(distance_sq <= AI_MID_RANGE ** 2,
+                                              AI_MID_INTERVAL, AI_FAR_INTERVAL))
+        self.update_interval[idx] = interval
+        self.next_update[idx] = ai.tick + interval
+
+    def update(self, player, idx, dt, level):
+        # Advances the walkers at idx, each by its own time step. Returns the
+        # voidwalkers touching the player after this tick.
+        if len(idx):
+            x = self.x[idx]
+            dx = player.x - x
+            dy = player.y - self.y[idx]
+            distance = np.sqrt(dx * dx + dy * dy)
+            
+            chase = distance <= self.detection_range[idx]
+            self.chase_mode[idx] = chase
+            original_speed = self.original_speed[idx]
+            speed = np.where(chase, original_speed * 1.5, original_speed)
+            self.speed[idx] = speed
+            
+            # Patrol: step toward the current end point, turn around once past it
+            moving_right = self.moving_right[idx]
+            patrol_right = ~chase & moving_right
+            patrol_left = ~chase & ~moving_right
+            step_right = patrol_right & (x < self.patrol_b[idx])
+            step_left = patrol_left & (x > self.patrol_a[idx])
+            distance_step = speed * dt
+            self.x[idx] = np.where(step_right, x + distance_step,
+                                   np.where(step_left, x - distance_step, x))
+            self.facing_left[idx] = np.where(step_right, False,
+                                             np.where(step_left, True, self.facing_left[idx]))
+            self.moving_right[idx] = np.where(patrol_right & ~step_right, False,
+                                              np.where(patrol_left & ~step_left, True, moving_right))
+            
+            # Chasers need wall collisions, so they go through the object path
+            for j in np.flatnonzero(chase).tolist():
+                i = int(idx[j])
+                voidwalker = self.voidwalkers[i]
+                self.sync_one(voidwalker, i)
+                voidwalker.chase_player(player, float(dt[j]), level)
+                self.x[i] = voidwalker.x
+                self.y[i] = voidwalker.y
+                self.facing_left[i] = voidwalker.direction == Direction.LEFT
+            
+            # Animation cursors
+            timer = self.anim_timer[idx] + dt
+            advance = timer >= self.anim_speed[idx]
+            timer[advance] = 0
+            self.anim_timer[idx] = timer
+            frame = self.anim_frame[idx]
+            self.anim_frame[idx] = np.where(advance, (frame + 1) % self.frame_count[idx], frame)
+            
+            # Keep the spatial hash current for walkers that changed cells
+            rect_x = self.round_half_away(self.x[idx])
+            rect_y = self.round_half_away(self.y[idx])
+            self.rect_x[idx] = rect_x
+            self.rect_y[idx] = rect_y
+            cells = self.cell_ranges(rect_x, rect_y, self.rect_w[idx], self.rect_h[idx])
+            for j in np.flatnonzero(np.any(cells != self.cells[idx], axis=1)).tolist():
+                i = int(idx[j])
+                voidwalker = self.voidwalkers[i]
+                self.sync_one(voidwalker, i)
+                self.grid.update(voidwalker, voidwalker.rect)
+            self.cells[idx] = cells
+        
+        # Same test as Rect.colliderect, against the walkers the grid has
+        # near the player
+        pr = player.rect
+        hit_walkers = []
+        for voidwalker in self.grid.query(pr):
+            i = self.index[voidwalker]
+            if (self.rect_x[i] < pr.right and self.rect_x[i] + self.rect_w[i] > pr.left and
+                    self.rect_y[i] < pr.bottom and self.rect_y[i] + self.rect_h[i] > pr.top):
+                self.sync_one(voidwalker, i)
+                hit_walkers.append(voidwalker)
+        return hit_walkers
+
+    def sync_one(self, voidwalker, i):
+        voidwalker.x = float(self.x[i])
+        voidwalker.y = float(self.y[i])
+        voidwalker.speed = float(self.speed[i])
+        voidwalker.moving_right = bool(self.moving_right[i])
+        voidwalker.chase_mode = bool(self.chase_mode[i])
+        voidwalker.next_update = int(self.next_update[i])
+        voidwalker.update_interval = int(self.update_interval[i])
+        voidwalker.last_update_tick = int(self.last_update_tick[i])
+        voidwalker.last_update_time = float(self.last_update_time[i])
+        voidwalker.attack_cooldown = float(self.attack_cooldown[i])
+        voidwalker.teleport_cooldown = float(self.teleport_cooldown[i])
+        voidwalker.can_teleport = bool(self.can_teleport[i])
+        voidwalker.direction = Direction.LEFT if self.facing_left[i] else Direction.RIGHT
+        voidwalker.rect.x = voidwalker.x
+        voidwalker.rect.y = voidwalker.y
+        sprite = voidwalker.sprite
+        sprite.animation_timer = float(self.anim_timer[i])
+        sprite.current_frame = int(self.anim_frame[i])
+        sprite.image = sprite.frames[sprite.current_frame]
+
+    def pack_records(self, records):
+        # records is a RECORD array over a snapshot, in voidwalker order
+        records["x"] = self.x
+        records["y"] = self.y
+        records["anim_timer"] = self.anim_timer
+        records["last_update_time"] = self.last_update_time
+        records["next_update"] = self.next_update
+        records["last_update_tick"] = self.last_update_tick
+        records["attack_cooldown"] = self.attack_cooldown
+        records["teleport_cooldown"] = self.teleport_cooldown
+        records["anim_frame"] = self.anim_frame
+        records["update_interval"] = self.update_interval
+        records["flags"] = (self.moving_right * snapshot.WALKER_MOVING_RIGHT |
+                            self.facing_left * snapshot.WALKER_FACING_LEFT |
+                            self.chase_mode * snapshot.WALKER_CHASING |
+                            self.can_teleport * snapshot.WALKER_CAN_TELEPORT)
+
+    def restore_records(self, records):
+        self.x[:] = records["x"]
+        self.y[:] = records["y"]
+        self.anim_timer[:] = records["anim_timer"]
+        self.last_update_time[:] = records["last_update_time"]
+        self.next_update[:] = records["next_update"]
+        self.last_update_tick[:] = records["last_update_tick"]
+        self.attack_cooldown[:] = records["attack_cooldown"]
+        self.teleport_cooldown[:] = records["teleport_cooldown"]
+        self.anim_frame[:] = records["anim_frame"]
+        self.update_interval[:] = records["update_interval"]
+        flags = records["flags"]
+        self.moving_right[:] = flags & snapshot.WALKER_MOVING_RIGHT != 0
+        self.facing_left[:] = flags & snapshot.WALKER_FACING_LEFT != 0
+        self.chase_mode[:] = flags & snapshot.WALKER_CHASING != 0
+        self.can_teleport[:] = flags & snapshot.WALKER_CAN_TELEPORT != 0
+        self.speed = np.where(self.chase_mode, self.original_speed * 1.5, self.original_speed)
+        
+        self.rect_x, self.rect_y = self.rounded_position()
+        cells = self.cell_ranges()
+        for i in np.flatnonzero(np.any(cells != self.cells, axis=1)).tolist():
+            voidwalker = self.voidwalkers[i]
+            self.sync_one(voidwalker, i)
+            self.grid.update(voidwalker, voidwalker.rect)
+        self.cells = cells
+
+    def sync(self, voidwalkers=None):
+        # Write the array state back into the Voidwalker objects
+        if voidwalkers is None:
+            voidwalkers = self.voidwalkers
+        for voidwalker in voidwalkers:
+            self.sync_one(voidwalker, self.index[voidwalker])
 
 class Wall:
     def __init__(self, x, y, width, height):
@@ -300,35 +1090,219 @@ class OxygenStation:
         self.height = self.sprite.rect.height
         self.rect = pygame.Rect(x, y, self.width, self.height)
 
+    def blit_item(self, camera_x, camera_y, render_scale=1):
+        return self.sprite.blit_item(self.x - camera_x, self.y - camera_y, render_scale)
+
     def draw(self, surface, camera_x, camera_y):
-        screen_x = self.x - camera_x
-        screen_y = self.y - camera_y
-        self.sprite.draw(surface, screen_x, screen_y)
+        surface.blit(*self.blit_item(camera_x, camera_y))
+
+class StaticLayer:
+    # Walls and the exit tile never change, so they are baked into chunk
+    # surfaces once and each frame only blits the chunks under the camera.
+    # Streamed levels bake and drop regions as they load and unload.
+    # Chunks for a render scale below 1 are scaled down once, when first drawn.
+    def __init__(self, chunk_size=STATIC_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.chunks = {}
+        self.scaled_chunks = {}
+        self.scaled_scale = 1
+
+    def bake(self, region, walls, exit_rect):
+        # `walls` must hold every wall overlapping `region`, in draw order
+        cs = self.chunk_size
+        for cx, cy in self.chunks_in_rect(region):
+            self.chunks.pop((cx, cy), None)
+            self.scaled_chunks.pop((cx, cy), None)
+            chunk_rect = pygame.Rect(cx * cs, cy * cs, cs, cs)
+            for wall in walls:
+                if wall.rect.colliderect(chunk_rect):
+                    wall.draw(self.get_chunk(cx, cy), chunk_rect.x, chunk_rect.y)
+            if exit_rect.colliderect(chunk_rect):
+                pygame.draw.rect(self.get_chunk(cx, cy), GREEN,
+                                 exit_rect.move(-chunk_rect.x, -chunk_rect.y))
+
+    def drop(self, region):
+        for key in self.chunks_in_rect(region):
+            self.chunks.pop(key, None)
+            self.scaled_chunks.pop(key, None)
+
+    def chunks_in_rect(self, rect):
+        cs = self.chunk_size
+        for cy in range(rect.top // cs, (rect.bottom - 1) // cs + 1):
+            for cx in range(rect.left // cs, (rect.right - 1) // cs + 1):
+                yield cx, cy
+
+    def get_chunk(self, cx, cy):
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            chunk = pygame.Surface((self.chunk_size, self.chunk_size))
+            if pygame.display.get_surface() is not None:
+                chunk = chunk.convert()
+            chunk.fill(BLACK)
+            self.chunks[(cx, cy)] = chunk
+        return chunk
+
+    def scaled_chunk(self, key, render_scale):
+        if render_scale != self.scaled_scale:
+            self.scaled_chunks.clear()
+            self.scaled_scale = render_scale
+        chunk = self.scaled_chunks.get(key)
+        if chunk is None:
+            size = round(self.chunk_size * render_scale)
+            chunk = pygame.transform.smoothscale(self.chunks[key], (size, size))
+            self.scaled_chunks[key] = chunk
+        return chunk
+
+    def draw(self, surface, camera_x, camera_y, render_scale=1):
+        # `surface` shows the view at render_scale, so it covers 1/render_scale
+        # times its own size of the level
+        cs = self.chunk_size
+        width, height = surface.get_size()
+        view = pygame.Rect(camera_x, camera_y, math.ceil(width / render_scale),
+                           math.ceil(height / render_scale))
+        # Scaled chunks are placed from one rounded origin so they stay seamless
+        origin_x = round(camera_x * render_scale)
+        origin_y = round(camera_y * render_scale)
+        scaled_cs = round(cs * render_scale)
+        drawn = 0
+        for cx, cy in self.chunks_in_rect(view):
+            if (cx, cy) in self.chunks:
+                chunk = self.chunks[(cx, cy)]
+                if render_scale != 1:
+                    chunk = self.scaled_chunk((cx, cy), render_scale)
+                surface.blit(chunk, (cx * scaled_cs - origin_x, cy * scaled_cs - origin_y))
+                drawn += 1
+        return drawn
+
+class FlowField:
+    # Breadth-first search outward from the player's tile. Every reached tile
+    # stores its neighbour one step closer to the player, so any number of
+    # chasing voidwalkers read their next move in O(1). The search is only
+    # redone when the player moves to another tile, and stops at `radius`.
+    def __init__(self, tiles_wide, tiles_high, blocked, footprint=1,
+                 radius=FLOW_FIELD_RADIUS):
+        self.tiles_wide = tiles_wide
+        self.tiles_high = tiles_high
+        self.radius = radius
+        self.passable = self.build_passable(blocked, footprint)
+        self.next_tile = array("i", [-1]) * (tiles_wide * tiles_high)
+        # Tiles whose stamp isn't the current generation weren't reached
+        self.stamp = array("i", [0]) * (tiles_wide * tiles_high)
+        self.generation = 0
+        self.target = None
+        self.dirty = False
+
+    def build_passable(self, blocked, footprint):
+        # A tile is open when an entity `footprint` tiles wide fits with its
+        # top-left corner on it
+        w, h = self.tiles_wide, self.tiles_high
+        # Rows are OR-ed as big integers (one byte per tile), which keeps
+        # this fast enough to run on every level load
+        rows = [int.from_bytes(blocked[ty * w:(ty + 1) * w], "little") for ty in range(h)]
+        for ty in range(h):
+            row = rows[ty]
+            for ox in range(1, footprint):
+                rows[ty] |= row >> (8 * ox)
+        free = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+        passable = bytearray(w * h)
+        for ty in range(h - footprint + 1):
+            covered = 0
+            for oy in range(footprint):
+                covered |= rows[ty + oy]
+            row = covered.to_bytes(w, "little").translate(free)
+            passable[ty * w:ty * w + w - footprint + 1] = row[:w - footprint + 1]
+        return passable
+
+    def set_target(self, tx, ty):
+        if not (0 <= tx < self.tiles_wide and 0 <= ty < self.tiles_high):
+            self.target = None
+        elif (tx, ty) != self.target:
+            self.target = (tx, ty)
+            self.dirty = True
+
+    def rebuild(self):
+        self.dirty = False
+        self.generation += 1
+        w = self.tiles_wide
+        size = w * self.tiles_high
+        passable, next_tile, stamp = self.passable, self.next_tile, self.stamp
+        generation = self.generation
+        tx, ty = self.target
+        start = ty * w + tx
+        stamp[start] = generation
+        next_tile[start] = start
+        
+        # Expand one ring per iteration on flat indices; diagonal moves
+        # may not cut across the corner of a blocked tile
+        frontier = [start]
+        for _ in range(self.radius):
+            reached = []
+            for here in frontier:
+                x = here % w
+                left = x > 0
+                right = x < w - 1
+                for index, ok in ((here - 1, left), (here + 1, right),
+                                  (here - w, True), (here + w, True)):
+                    if (ok and 0 <= index < size and stamp[index] != generation
+                            and passable[index]):
+                        stamp[index] = generation
+                        next_tile[index] = here
+                        reached.append(index)
+                for index, side, vertical, ok in (
+                        (here - w - 1, here - 1, here - w, left),
+                        (here - w + 1, here + 1, here - w, right),
+                        (here + w - 1, here - 1, here + w, left),
+                        (here + w + 1, here + 1, here + w, right)):
+                    if (ok and 0 <= index < size and stamp[index] != generation
+                            and passable[index] and passable[side] and passable[vertical]):
+                        stamp[index] = generation
+                        next_tile[index] = here
+                        reached.append(index)
+            if not reached:
+                break
+            frontier = reached
+
+    def next_step(self, tx, ty):
+        # Tile to head for from (tx, ty), or None when there is no path
+        # (or the entity already shares the player's tile)
+        if self.target is None or (tx, ty) == self.target:
+            return None
+        if not (0 <= tx < self.tiles_wide and 0 <= ty < self.tiles_high):
+            return None
+        if self.dirty:
+            self.rebuild()
+        index = ty * self.tiles_wide + tx
+        if self.stamp[index] != self.generation:
+            return None
+        step = self.next_tile[index]
+        return step % self.tiles_wide, step // self.tiles_wide
 
 class Level:
+    # The map is split into LEVEL_CHUNK_TILES square regions. Small maps load
+    # every region up front; larger ones only keep the regions around the
+    # camera resident (at most MAX_RESIDENT_CHUNKS, least recently used
+    # dropped first), so objects, grids and baked surfaces stay bounded.
     def __init__(self, level_data):
+        self.level_data = level_data
         self.walls = []
         self.oxygen_stations = []
         self.voidwalkers = []
         self.width = level_data["width"] * TILE_SIZE
         self.height = level_data["height"] * TILE_SIZE
         
-        # Create level objects from data
-        for wall in level_data["walls"]:
-            # Convert tile coordinates and dimensions to pixels
-            x = wall["x"] * TILE_SIZE
-            y = wall["y"] * TILE_SIZE
-            width = wall["width"] * TILE_SIZE
-            height = wall["height"] * TILE_SIZE
-            self.walls.append(Wall(x, y, width, height))
+        # Broad-phase grids so collision checks only see nearby objects
+        self.wall_grid = SpatialHash(TILE_SIZE)
+        self.station_grid = SpatialHash(TILE_SIZE)
+        self.voidwalker_grid = SpatialHash(ENTITY_CELL_SIZE)
+        self.swarm = None
+        self.ai = AIScheduler()
+        # Bumped whenever the resident voidwalkers change; snapshots only
+        # restore onto the set they were taken from
+        self.resident_version = 0
         
-        for station in level_data["oxygen_stations"]:
-            self.oxygen_stations.append(OxygenStation(station["x"] * TILE_SIZE,
-                                                    station["y"] * TILE_SIZE))
-        
-        for voidwalker in level_data["voidwalkers"]:
-            self.voidwalkers.append(Voidwalker(voidwalker["x"] * TILE_SIZE,
-                                             voidwalker["y"] * TILE_SIZE))
+        # Visible sets come back from the grids unordered; keep the level's
+        # draw order so overlapping sprites stack the same way
+        self.draw_order = {}
         
         self.player_start = (level_data["player_start"]["x"] * TILE_SIZE,
                            level_data["player_start"]["y"] * TILE_SIZE)
@@ -336,6 +1310,439 @@ class Level:
         self.exit_rect = pygame.Rect(level_data["exit"]["x"] * TILE_SIZE,
                                    level_data["exit"]["y"] * TILE_SIZE,
                                    TILE_SIZE, TILE_SIZE)
+        self.exit_cells = self.wall_grid.cell_range(self.exit_rect)
+        
+        self.static_layer = StaticLayer()
+        
+        # Raw level data bucketed per region. Walls go into every region they
+        # overlap and are shared (ref-counted) while any of them is loaded.
+        self.chunk_pixels = LEVEL_CHUNK_TILES * TILE_SIZE
+        self.chunk_records = {}
+        for index, wall in enumerate(level_data["walls"]):
+            rect = self.wall_rect(wall)
+            for key in self.chunks_in_rect(rect):
+                self.chunk_record(key)["walls"].append(index)
+        for index, station in enumerate(level_data["oxygen_stations"]):
+            key = self.chunk_of(station["x"] * TILE_SIZE, station["y"] * TILE_SIZE)
+            self.chunk_record(key)["oxygen_stations"].append((index, station))
+        for index, voidwalker in enumerate(level_data["voidwalkers"]):
+            key = self.chunk_of(voidwalker["x"] * TILE_SIZE, voidwalker["y"] * TILE_SIZE)
+            self.chunk_record(key)["voidwalkers"].append((index, voidwalker))
+        # The exit is baked with its region, which may hold nothing else
+        for key in self.chunks_in_rect(self.exit_rect):
+            self.chunk_record(key)
+        
+        self.resident = OrderedDict()
+        self.wall_refs = {}
+        self.wall_index = {}
+        self.stream_range = None
+        
+        chunks_wide = -(-level_data["width"] // LEVEL_CHUNK_TILES)
+        chunks_high = -(-level_data["height"] // LEVEL_CHUNK_TILES)
+        self.streaming = chunks_wide * chunks_high > MAX_RESIDENT_CHUNKS
+        if self.streaming:
+            start_view = pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+            start_view.center = self.player_start
+            self.update_streaming(start_view)
+        else:
+            self.load_chunks(list(self.chunk_records))
+        
+        # Tile occupancy for pathfinding; compiled levels ship it precomputed
+        tiles_wide, tiles_high = level_data["width"], level_data["height"]
+        blocked = level_data.get("occupancy")
+        if blocked is None:
+            blocked = b"".join(level_compiler.occupancy_rows(level_data))
+        footprint = math.ceil(Voidwalker.FRAME_SIZE * Voidwalker.SCALE / TILE_SIZE)
+        self.flow_field = FlowField(tiles_wide, tiles_high, blocked, footprint)
+
+    @staticmethod
+    def wall_rect(wall):
+        # Convert tile coordinates and dimensions to pixels
+        return pygame.Rect(wall["x"] * TILE_SIZE, wall["y"] * TILE_SIZE,
+                           wall["width"] * TILE_SIZE, wall["height"] * TILE_SIZE)
+
+    def chunk_of(self, x, y):
+        return int(x // self.chunk_pixels), int(y // self.chunk_pixels)
+
+    def chunks_in_rect(self, rect):
+        cp = self.chunk_pixels
+        return [(cx, cy)
+                for cy in range(rect.top // cp, (rect.bottom - 1) // cp + 1)
+                for cx in range(rect.left // cp, (rect.right - 1) // cp + 1)]
+
+    def chunk_rect(self, key):
+        cp = self.chunk_pixels
+        return pygame.Rect(key[0] * cp, key[1] * cp, cp, cp)
+
+    def chunk_record(self, key):
+        record = self.chunk_records.get(key)
+        if record is None:
+            record = {"walls": [], "oxygen_stations": [], "voidwalkers": []}
+            self.chunk_records[key] = record
+        return record
+
+    def update_streaming(self, view_rect):
+        # Load the regions around the camera and evict the stalest ones
+        if not self.streaming:
+            return
+        needed_rect = view_rect.inflate(2 * STREAM_MARGIN, 2 * STREAM_MARGIN)
+        needed = [key for key in self.chunks_in_rect(needed_rect) if key in self.chunk_records]
+        if needed == self.stream_range:
+            return
+        self.stream_range = needed
+        
+        self.load_chunks([key for key in needed if key not in self.resident])
+        for key in needed:
+            self.resident.move_to_end(key)
+        
+        evicted = False
+        needed = set(needed)
+        while len(self.resident) > MAX_RESIDENT_CHUNKS:
+            key = next(iter(self.resident))
+            if key in needed:
+                break
+            self.unload_chunk(key)
+            evicted = True
+        if evicted:
+            self.park_voidwalkers()
+
+    def load_chunks(self, keys):
+        if not keys:
+            return
+        new_walls = []
+        new_stations = []
+        new_voidwalkers = []
+        for key in keys:
+            record = self.chunk_records[key]
+            self.resident[key] = []
+            for index in record["walls"]:
+                ref = self.wall_refs.get(index)
+                if ref is None:
+                    rect = self.wall_rect(self.level_data["walls"][index])
+                    wall = Wall(rect.x, rect.y, rect.width, rect.height)
+                    self.wall_refs[index] = [wall, 1]
+                    self.wall_index[wall] = index
+                    new_walls.append((index, wall))
+                else:
+                    ref[1] += 1
+            new_stations.extend((index, station, key) for index, station in record["oxygen_stations"])
+            # Voidwalkers leave the record while loaded; unloading parks them again
+            new_voidwalkers.extend(record["voidwalkers"])
+            record["voidwalkers"] = []
+        
+        # Create objects in level order so behaviour and stacking don't
+        # depend on which region happened to load first
+        for index, wall in sorted(new_walls, key=lambda entry: entry[0]):
+            self.walls.append(wall)
+            self.wall_grid.insert(wall, wall.rect)
+        for index, data, key in sorted(new_stations, key=lambda entry: entry[0]):
+            station = OxygenStation(data["x"] * TILE_SIZE, data["y"] * TILE_SIZE)
+            self.oxygen_stations.append(station)
+            self.station_grid.insert(station, station.rect)
+            self.draw_order[station] = index
+            self.resident[key].append(station)
+        for index, data in sorted(new_voidwalkers, key=lambda entry: entry[0]):
+            voidwalker = self.spawn_voidwalker(data)
+            self.voidwalkers.append(voidwalker)
+            self.voidwalker_grid.insert(voidwalker, voidwalker.rect)
+            self.ai.add(voidwalker)
+            self.draw_order[voidwalker] = len(self.level_data["oxygen_stations"]) + index
+        
+        for key in keys:
+            region = self.chunk_rect(key)
+            walls = sorted(self.wall_grid.query(region), key=self.wall_index.__getitem__)
+            self.static_layer.bake(region, walls, self.exit_rect)
+        if new_voidwalkers:
+            self.rebuild_swarm()
+
+    def unload_chunk(self, key):
+        stations = self.resident.pop(key)
+        for index in self.chunk_records[key]["walls"]:
+            ref = self.wall_refs[index]
+            ref[1] -= 1
+            if ref[1] == 0:
+                wall = ref[0]
+                del self.wall_refs[index]
+                del self.wall_index[wall]
+                self.wall_grid.remove(wall)
+                self.walls.remove(wall)
+        for station in stations:
+            self.station_grid.remove(station)
+            self.oxygen_stations.remove(station)
+            del self.draw_order[station]
+        self.static_layer.drop(self.chunk_rect(key))
+
+    def park_voidwalkers(self):
+        # Voidwalkers standing in an unloaded region are saved back into that
+        # region's record and dropped until it loads again
+        self.sync_voidwalkers()
+        kept = []
+        first_index = len(self.level_data["oxygen_stations"])
+        for voidwalker in self.voidwalkers:
+            key = self.chunk_of(voidwalker.x, voidwalker.y)
+            if key in self.resident:
+                kept.append(voidwalker)
+                continue
+            index = self.draw_order.pop(voidwalker) - first_index
+            state = (voidwalker.x, voidwalker.y, voidwalker.patrol_point_a,
+                     voidwalker.patrol_point_b, voidwalker.moving_right, voidwalker.direction)
+            self.chunk_record(key)["voidwalkers"].append((index, state))
+            self.voidwalker_grid.remove(voidwalker)
+        if len(kept) != len(self.voidwalkers):
+            self.voidwalkers = kept
+            self.rebuild_swarm()
+
+    def spawn_voidwalker(self, data):
+        if isinstance(data, dict):
+            return Voidwalker(data["x"] * TILE_SIZE, data["y"] * TILE_SIZE)
+        x, y, patrol_a, patrol_b, moving_right, direction = data
+        voidwalker = Voidwalker(x, y)
+        voidwalker.patrol_point_a = patrol_a
+        voidwalker.patrol_point_b = patrol_b
+        voidwalker.moving_right = moving_right
+        voidwalker.direction = direction
+        return voidwalker
+
+    def rebuild_swarm(self):
+        self.sync_voidwalkers()
+        self.resident_version += 1
+        self.swarm = None
+        if np is not None and len(self.voidwalkers) >= SWARM_THRESHOLD:
+            self.swarm = VoidwalkerSwarm(self.voidwalkers, self.voidwalker_grid)
+        # The swarm schedules its walkers itself
+        self.ai.index(self.voidwalkers if self.swarm is None else ())
+
+    def walls_near(self, rect):
+        return self.wall_grid.query(rect)
+
+    def sweep(self, x, y, width, height, move_x, move_y, slides=3):
+        # Moves a width x height box from (x, y) by (move_x, move_y). The move
+        # stops at the first wall the box would touch (its time of impact),
+        # and what is left of it continues along that wall. Boxes that start
+        # out overlapping a wall are not held by it. Returns the new position
+        # and whether the move was blocked on each axis.
+        hit_x = hit_y = False
+        for _ in range(slides):
+            if not move_x and not move_y:
+                break
+            # Rect truncates floats, so round the swept box outwards first
+            left = math.floor(min(x, x + move_x)) - 1
+            top = math.floor(min(y, y + move_y)) - 1
+            area = pygame.Rect(left, top,
+                               math.ceil(max(x, x + move_x) + width) + 1 - left,
+                               math.ceil(max(y, y + move_y) + height) + 1 - top)
+            first = 1.0
+            normal = None
+            contact = 0
+            for wall in self.walls_near(area):
+                rect = wall.rect
+                if move_x > 0:
+                    x_entry = (rect.left - x - width) / move_x
+                    x_exit = (rect.right - x) / move_x
+                elif move_x < 0:
+                    x_entry = (rect.right - x) / move_x
+                    x_exit = (rect.left - x - width) / move_x
+                elif x + width <= rect.left or x >= rect.right:
+                    continue
+                else:
+                    x_entry, x_exit = -math.inf, math.inf
+                if move_y > 0:
+                    y_entry = (rect.top - y - height) / move_y
+                    y_exit = (rect.bottom - y) / move_y
+                elif move_y < 0:
+                    y_entry = (rect.bottom - y) / move_y
+                    y_exit = (rect.top - y - height) / move_y
+                elif y + height <= rect.top or y >= rect.bottom:
+                    continue
+                else:
+                    y_entry, y_exit = -math.inf, math.inf
+                
+                entry = max(x_entry, y_entry)
+                # A hair below zero is rounding on a box already touching the wall
+                if entry < -1e-9 or entry >= first or entry >= min(x_exit, y_exit):
+                    continue
+                first = max(entry, 0.0)
+                if x_entry >= y_entry:
+                    normal = "x"
+                    contact = rect.left - width if move_x > 0 else rect.right
+                else:
+                    normal = "y"
+                    contact = rect.top - height if move_y > 0 else rect.bottom
+            
+            if normal is None:
+                return x + move_x, y + move_y, hit_x, hit_y
+            # Snap to exact contact on the blocked axis and carry the rest
+            # of the move along the other one
+            if normal == "x":
+                x = contact
+                y += move_y * first
+                move_x, move_y = 0, move_y * (1 - first)
+                hit_x = True
+            else:
+                y = contact
+                x += move_x * first
+                move_x, move_y = move_x * (1 - first), 0
+                hit_y = True
+        return x, y, hit_x, hit_y
+
+    def stations_near(self, rect):
+        return self.station_grid.query(rect)
+
+    def visible_stations(self, view_rect):
+        stations = [station for station in self.station_grid.query(view_rect)
+                    if station.rect.colliderect(view_rect)]
+        stations.sort(key=self.draw_order.__getitem__)
+        return stations
+
+    def visible_voidwalkers(self, view_rect):
+        candidates = self.voidwalker_grid.query(view_rect)
+        if self.swarm is not None:
+            self.swarm.sync(candidates)
+        voidwalkers = [voidwalker for voidwalker in candidates
+                       if voidwalker.rect.colliderect(view_rect)]
+        voidwalkers.sort(key=self.draw_order.__getitem__)
+        return voidwalkers
+
+    def nearest_tile(self, x, y):
+        # Tile whose top-left corner is closest to (x, y). Rounding instead
+        # of flooring keeps an entity sitting exactly on a tile edge from
+        # flickering between two tiles.
+        return (int((x + TILE_SIZE // 2) // TILE_SIZE),
+                int((y + TILE_SIZE // 2) // TILE_SIZE))
+
+    def update_flow_field(self, target_x, target_y):
+        # Cheap unless the target moved to another tile; the search itself
+        # only runs once something asks for a step
+        self.flow_field.set_target(*self.nearest_tile(target_x, target_y))
+
+    def chase_target(self, x, y, target_x, target_y):
+        # Where to head for next on the way to (target_x, target_y): the
+        # next tile of the flow field, or the target itself when it's in
+        # the same tile or out of the field's reach
+        step = self.flow_field.next_step(*self.nearest_tile(x, y))
+        if step is None:
+            return target_x, target_y
+        return step[0] * TILE_SIZE, step[1] * TILE_SIZE
+
+    def update_voidwalkers(self, player, dt, view):
+        # Updates the voidwalkers due this tick and returns those touching
+        # the player. view is the camera rect.
+        self.ai.advance(dt)
+        view = view.inflate(AI_VIEW_MARGIN * 2, AI_VIEW_MARGIN * 2)
+        if self.swarm is not None:
+            idx, elapsed = self.swarm.due(self.ai, dt)
+            hits = self.swarm.update(player, idx, elapsed, self)
+            self.swarm.reschedule(idx, self.ai, player, view)
+            return hits
+        
+        due = self.ai.due(dt)
+        for voidwalker, elapsed in due:
+            voidwalker.update(player, elapsed, self)
+            self.voidwalker_grid.update(voidwalker, voidwalker.rect)
+        for voidwalker, _ in due:
+            self.ai.schedule(voidwalker, self.ai.interval(
+                voidwalker.x, voidwalker.y, voidwalker.chase_mode, player, view))
+        return [voidwalker for voidwalker in self.voidwalker_grid.query(player.rect)
+                if player.rect.colliderect(voidwalker.rect)]
+
+    def pack_voidwalkers(self, buffer, offset):
+        # One snapshot.WALKER record per resident voidwalker, in list order
+        if self.swarm is not None:
+            self.swarm.pack_records(np.frombuffer(buffer, VoidwalkerSwarm.RECORD,
+                                                  len(self.voidwalkers), offset))
+            return
+        for voidwalker in self.voidwalkers:
+            sprite = voidwalker.sprite
+            flags = ((voidwalker.moving_right and snapshot.WALKER_MOVING_RIGHT) |
+                     (voidwalker.direction == Direction.LEFT and snapshot.WALKER_FACING_LEFT) |
+                     (voidwalker.chase_mode and snapshot.WALKER_CHASING) |
+                     (voidwalker.can_teleport and snapshot.WALKER_CAN_TELEPORT))
+            snapshot.WALKER.pack_into(
+                buffer, offset, voidwalker.x, voidwalker.y, sprite.animation_timer,
+                voidwalker.last_update_time, voidwalker.next_update, voidwalker.last_update_tick,
+                voidwalker.attack_cooldown, voidwalker.teleport_cooldown,
+                sprite.current_frame, voidwalker.update_interval, flags)
+            offset += snapshot.WALKER.size
+
+    def restore_voidwalkers(self, data, offset):
+        # The inverse of pack_voidwalkers, onto the same resident voidwalkers
+        if self.swarm is not None:
+            self.swarm.restore_records(np.frombuffer(data, VoidwalkerSwarm.RECORD,
+                                                     len(self.voidwalkers), offset))
+            return
+        end = offset + len(self.voidwalkers) * snapshot.WALKER.size
+        for voidwalker, record in zip(self.voidwalkers, snapshot.WALKER.iter_unpack(data[offset:end])):
+            (voidwalker.x, voidwalker.y, timer, voidwalker.last_update_time,
+             voidwalker.next_update, voidwalker.last_update_tick, voidwalker.attack_cooldown,
+             voidwalker.teleport_cooldown, frame, voidwalker.update_interval, flags) = record
+            voidwalker.moving_right = bool(flags & snapshot.WALKER_MOVING_RIGHT)
+            voidwalker.direction = (Direction.LEFT if flags & snapshot.WALKER_FACING_LEFT
+                                    else Direction.RIGHT)
+            voidwalker.chase_mode = bool(flags & snapshot.WALKER_CHASING)
+            voidwalker.can_teleport = bool(flags & snapshot.WALKER_CAN_TELEPORT)
+            voidwalker.speed = (voidwalker.original_speed * 1.5 if voidwalker.chase_mode
+                                else voidwalker.original_speed)
+            voidwalker.rect.x = voidwalker.x
+            voidwalker.rect.y = voidwalker.y
+            sprite = voidwalker.sprite
+            sprite.animation_timer = timer
+            sprite.current_frame = frame
+            sprite.image = sprite.frames[frame]
+            self.voidwalker_grid.update(voidwalker, voidwalker.rect)
+        self.ai.index(self.voidwalkers)
+
+    def sync_voidwalkers(self):
+        # Bring every Voidwalker object up to date with the batch update
+        if self.swarm is not None:
+            self.swarm.sync()
+
+    def near_exit(self, rect):
+        # Same cell test the grids use, so the exit check stays O(1)
+        x0, y0, x1, y1 = self.wall_grid.cell_range(rect)
+        ex0, ey0, ex1, ey1 = self.exit_cells
+        return x0 <= ex1 and ex0 <= x1 and y0 <= ey1 and ey0 <= y1
+
+class LevelPrefetcher:
+    # Builds the next Level on a worker thread while the current one is
+    # played, so moving on only swaps in the finished object. Walls, grids,
+    # baked chunks, voidwalkers and their sprite frames are all done there.
+    def __init__(self):
+        self.levels = None
+        self.index = None
+        self.thread = None
+        self.result = None
+
+    def start(self, levels, index):
+        if levels is self.levels and index == self.index:
+            return
+        self.levels = levels
+        self.index = index
+        # Each build gets its own result slot, so an abandoned one finishing
+        # late can't overwrite a newer one
+        result = self.result = [None, None]
+        self.thread = threading.Thread(target=self.build, args=(levels, index, result),
+                                       name="prefetch", daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def build(levels, index, result):
+        try:
+            result[0] = Level(levels[index])
+        except Exception as error:
+            # Re-raised on the main thread by take
+            result[1] = error
+
+    def take(self, levels, index):
+        # The prefetched Level, waiting for it if it isn't done yet, or None
+        # if a different one was prefetched
+        if levels is not self.levels or index != self.index:
+            return None
+        self.thread.join()
+        level, error = self.result
+        self.levels = self.index = self.thread = self.result = None
+        if error is not None:
+            raise error
+        return level
 
 class Camera:
     def __init__(self, width, height):
@@ -343,6 +1750,7 @@ class Camera:
         self.height = height
         self.x = 0
         self.y = 0
+        self.rect = pygame.Rect(0, 0, width, height)
 
     def update(self, target_x, target_y, level_width, level_height):
         # Center the camera on the target
@@ -352,13 +1760,45 @@ class Camera:
         # Keep the camera within the level bounds
         self.x = max(0, min(self.x, level_width - WINDOW_WIDTH))
         self.y = max(0, min(self.y, level_height - WINDOW_HEIGHT))
+        
+        self.rect.x = self.x
+        self.rect.y = self.y
+
+    def view_rect(self):
+        # Entity rects are rounded, so pad a pixel to never drop a sliver
+        return self.rect.inflate(2, 2)
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, seed=None):
+        self.headless = headless
+        if headless:
+            # SDL's dummy drivers: no window, no audio device, no vsync.
+            # They have to be chosen before SDL is initialized.
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+        
+        # Only what the menu needs starts here; the mixer, sounds and the
+        # first level load on a background thread (see start_loading)
+        self.startup = StartupTimer()
+        start = time.perf_counter()
+        pygame.display.init()
+        pygame.font.init()
+        self.startup.record("display/font init", start)
+        # Seeded so headless runs are reproducible
+        self.seed = seed
+        self.rng = random.Random(seed)
+        
+        start = time.perf_counter()
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("Eclipse Protocol: Lost in the Void")
+        self.startup.record("set_mode", start)
         self.clock = pygame.time.Clock()
+        # Headless runs never open an audio device
+        self.audio = AudioManager(enabled=not headless)
+        start = time.perf_counter()
         self.font = pygame.font.Font(None, 36)
+        self.text = TextCache(self.font)
+        self.startup.record("font load", start)
         self.state = GameState.MENU
         self.current_level = 1
         self.victory = False
@@ -367,137 +1807,412 @@ class Game:
         self.game_speed = 1
         self.current_distance = EASY_DISTANCE
         self.death_cause = None
-        
-        # Load levels
-        with open("assets/levels.json", "r") as f:
-            self.level_data = json.load(f)
-        
-        # Load sounds
-        pygame.mixer.music.load("assets/background_music.mp3")
-        self.collect_sound = pygame.mixer.Sound("assets/collect.wav")
-        self.damage_sound = pygame.mixer.Sound("assets/damage.wav")
-        
+        self.death_message = None
+        # Drawn/culled counts from the last frame, per entity kind
+        self.render_stats = {}
+        # What the last frame showed, to decide whether the display needs a
+        # full flip or only the rects that changed
+        self.shown_view = None
+        self.shown_sprites = []
+        self.needs_redraw = True
+        # Fraction of the window's resolution the world is drawn at (see
+        # draw_scene), whether the HUD stays at full resolution on top, and
+        # whether the scale follows the frame time (see adapt_render_scale)
+        self.render_scale = 1.0
+        self.world_surface = None
+        self.scaled_text = None
+        self.native_hud = True
+        self.adaptive_resolution = False
+        self.adapt_time = 0.0
+        self.adapt_frames = 0
         self.camera = Camera(WINDOW_WIDTH, WINDOW_HEIGHT)
-        self.reset_level()
+        self.level = None
+        self.player = None
+        # Print the startup breakdown once loading finishes
+        self.startup_report = False
+        # Per-phase frame timings; F3 shows them, profile_out saves them on exit
+        self.profiler = FrameProfiler()
+        self.profile_out = None
+        # Input log being written, or the Replayer driving the game instead
+        # of the keyboard
+        self.recorder = None
+        self.playback = None
+        # Recent snapshots for BACKSPACE, the F5 checkpoint for F9, and the
+        # buffer snapshots are packed into
+        self.rewind = snapshot.RewindBuffer(REWIND_BUFFER_BYTES)
+        self.checkpoint = None
+        self.snapshot_data = bytearray()
+        # Windowed games build the level that comes next in the background
+        self.prefetcher = LevelPrefetcher()
+        
+        if not headless:
+            # Put the menu up before anything slow happens
+            self.draw()
+            self.startup.record("time to first frame", PROCESS_START)
+        self.start_loading()
 
-    def reset_level(self):
-        level_info = self.level_data["levels"][self.current_level]
-        self.level = Level(level_info)
+    def start_loading(self):
+        self.loaded = False
+        self.loader_error = None
+        if self.headless:
+            self.loader = None
+            self.load_resources()
+            self.finish_loading()
+        else:
+            self.loader = threading.Thread(target=self.load_resources,
+                                           name="loader", daemon=True)
+            self.loader.start()
+
+    def load_resources(self):
+        try:
+            start = time.perf_counter()
+            self.audio.init()
+            self.startup.record("mixer init", start)
+            
+            # Load sounds
+            start = time.perf_counter()
+            for name, (path, cooldown, max_voices, priority) in SOUNDS.items():
+                self.audio.load(name, path, cooldown, max_voices, priority)
+            self.startup.record("sounds", start)
+            
+            # Load levels from the compiled cache (rebuilt if levels.json changed)
+            start = time.perf_counter()
+            self.level_data = level_compiler.load_levels("assets/levels.json", "assets/levels.bin")
+            self.startup.record("level data", start)
+            
+            start = time.perf_counter()
+            self.build_level()
+            self.startup.record("first level", start)
+        except Exception as error:
+            # Re-raised on the main thread by finish_loading
+            self.loader_error = error
+
+    def finish_loading(self):
+        # Blocks until the background load is done
+        if self.loaded:
+            return
+        if self.loader is not None:
+            self.loader.join()
+        if self.loader_error is not None:
+            raise self.loader_error
+        self.loaded = True
+
+    def loading_done(self):
+        return self.loader is None or not self.loader.is_alive()
+
+    def build_level(self):
+        levels = self.level_data["levels"]
+        self.level = self.prefetcher.take(levels, self.current_level)
+        if self.level is None:
+            self.level = Level(levels[self.current_level])
         self.player = Player(*self.level.player_start)
-        pygame.mixer.music.play(-1)
+        # Snapshots only apply to the level they were taken on
+        self.rewind.clear()
+        self.checkpoint = None
+        if not self.headless:
+            self.audio.play_music(MUSIC)
 
-    def handle_input(self, dt):
+    def prefetch_level(self, index):
+        # Started from the level complete and game over screens: the main
+        # loop sleeps there, so the worker has the interpreter to itself
+        # instead of taking turns with gameplay frames
+        if not self.headless:
+            self.prefetcher.start(self.level_data["levels"], index)
+
+    def reset_level(self):
+        self.finish_loading()
+        self.build_level()
+
+    def start_session(self, level):
+        # Back to the state the game launches in, on `level`; replays start here
+        self.rng = random.Random(self.seed)
+        self.score = 0
+        self.game_speed = 1
+        self.current_distance = EASY_DISTANCE
+        self.current_level = level
+        self.state = GameState.MENU
+        self.victory = False
+        self.death_cause = None
+        self.death_message = None
+        self.reset_level()
+
+    def read_keys(self):
+        # WASD as recording's input bits
         keys = pygame.key.get_pressed()
-        dx = keys[pygame.K_d] - keys[pygame.K_a]
-        dy = keys[pygame.K_s] - keys[pygame.K_w]
-        self.player.move(dx, dy, dt, self.level.walls)
+        return ((keys[pygame.K_w] and recording.KEY_W) | (keys[pygame.K_a] and recording.KEY_A) |
+                (keys[pygame.K_s] and recording.KEY_S) | (keys[pygame.K_d] and recording.KEY_D))
+
+    def handle_input(self, dt, movement=None):
+        # Scripted callers pass (dx, dy) directly instead of the keyboard
+        if movement is None:
+            movement = recording.movement_from_bits(self.read_keys())
+        dx, dy = movement
+        self.player.move(dx, dy, dt, self.level)
 
     def update(self, dt):
         if self.state == GameState.PLAYING:
+            profiler = self.profiler
+            start = time.perf_counter()
             self.player.update(dt)
             
             # Update camera
             self.camera.update(self.player.x, self.player.y,
                              self.level.width, self.level.height)
+            self.level.update_streaming(self.camera.rect)
+            start = profiler.add("player", start)
             
             # Update voidwalkers
-            for voidwalker in self.level.voidwalkers:
-                voidwalker.update(self.player, dt, self.level.walls)
-                if self.player.rect.colliderect(voidwalker.rect):
-                    self.damage_sound.play()
-                    self.state = GameState.GAME_OVER
-                    self.death_cause = "voidwalker"
+            self.level.update_flow_field(self.player.x, self.player.y)
+            for voidwalker in self.level.update_voidwalkers(self.player, dt, self.camera.rect):
+                self.audio.play("damage")
+                self.set_death("voidwalker")
+            start = profiler.add("voidwalkers", start)
             
             # Check oxygen stations
-            for station in self.level.oxygen_stations:
+            for station in self.level.stations_near(self.player.rect):
                 if self.player.rect.colliderect(station.rect):
                     self.player.oxygen = min(100, self.player.oxygen + 30 * dt)
-                    self.collect_sound.play()
+                    self.audio.play("collect")
+            start = profiler.add("stations", start)
             
             # Check level exit
-            if self.player.rect.colliderect(self.level.exit_rect):
+            if (self.level.near_exit(self.player.rect) and
+                    self.player.rect.colliderect(self.level.exit_rect)):
                 if self.current_level < len(self.level_data["levels"]) - 1:
                     self.state = GameState.LEVEL_COMPLETE
                     self.current_level += 1
+                    self.prefetch_level(self.current_level)
                 else:
                     self.state = GameState.GAME_OVER
                     self.victory = True
             
             # Check game over conditions
             if self.player.oxygen <= 0:
-                self.state = GameState.GAME_OVER
-                self.death_cause = "oxygen"
+                self.set_death("oxygen")
+            profiler.add("exit", start)
 
-    def draw_hud(self):
+    def capture_snapshot(self):
+        # The moving parts of the current state; the returned view is
+        # overwritten by the next capture
+        level = self.level
+        player = self.player
+        count = len(level.voidwalkers)
+        size = snapshot.HEADER.size + count * snapshot.WALKER.size
+        if len(self.snapshot_data) < size:
+            self.snapshot_data = bytearray(size)
+        snapshot.HEADER.pack_into(
+            self.snapshot_data, 0, level.resident_version, self.current_level,
+            level.ai.tick, level.ai.clock,
+            player.x, player.y, player.oxygen, player.sprite.animation_timer,
+            player.sprite.current_frame,
+            player.direction == Direction.LEFT and snapshot.PLAYER_FACING_LEFT, count)
+        level.pack_voidwalkers(self.snapshot_data, snapshot.HEADER.size)
+        return memoryview(self.snapshot_data)[:size]
+
+    def restore_snapshot(self, data):
+        # Puts the level back to `data` without rebuilding it. Returns False
+        # if the level has streamed in other voidwalkers since.
+        level = self.level
+        (resident_version, level_index, tick, clock, x, y, oxygen, timer, frame, flags,
+         count) = snapshot.HEADER.unpack_from(data)
+        if resident_version != level.resident_version or count != len(level.voidwalkers):
+            return False
+        # Reaching the exit on the tick the oxygen ran out has already
+        # moved current_level on, with this level still loaded
+        self.current_level = level_index
+        level.ai.tick = tick
+        level.ai.clock = clock
+        player = self.player
+        player.x = x
+        player.y = y
+        player.rect.x = x
+        player.rect.y = y
+        player.oxygen = oxygen
+        player.direction = Direction.LEFT if flags & snapshot.PLAYER_FACING_LEFT else Direction.RIGHT
+        player.sprite.animation_timer = timer
+        player.sprite.current_frame = frame
+        player.sprite.image = player.sprite.frames[frame]
+        level.restore_voidwalkers(data, snapshot.HEADER.size)
+        
+        self.camera.update(player.x, player.y, level.width, level.height)
+        level.update_streaming(self.camera.rect)
+        # Snapshots are taken mid-play, so a death is undone too
+        if self.state != GameState.PAUSED:
+            self.state = GameState.PLAYING
+        self.victory = False
+        self.death_cause = None
+        self.death_message = None
+        return True
+
+    def can_rewind(self):
+        return (self.state in (GameState.PLAYING, GameState.PAUSED) or
+                (self.state == GameState.GAME_OVER and not self.victory))
+
+    def set_death(self, cause):
+        self.state = GameState.GAME_OVER
+        self.death_cause = cause
+        # Pick the message once instead of on every game-over frame
+        self.death_message = self.rng.choice(DEATH_MESSAGES[cause])
+        # R restarts from the first level
+        self.prefetch_level(1)
+
+    def set_render_scale(self, render_scale):
+        self.render_scale = render_scale
+        if render_scale == 1:
+            self.world_surface = None
+            self.scaled_text = None
+        else:
+            size = (round(WINDOW_WIDTH * render_scale), round(WINDOW_HEIGHT * render_scale))
+            # Same pixel format as the window, so it can be scaled straight into it
+            self.world_surface = pygame.Surface(size).convert(self.screen)
+            # Lettering for a HUD drawn at the lower resolution
+            self.scaled_text = TextCache(pygame.font.Font(None, round(36 * render_scale)))
+        self.adapt_time = 0.0
+        self.adapt_frames = 0
+        # The next frame is drawn whole
+        self.shown_view = None
+
+    def adapt_render_scale(self, frame_time):
+        # Averages the frame time over RENDER_ADAPT_FRAMES frames of play,
+        # then steps down a render scale when over budget and back up when
+        # well under it; the gap between the two keeps it from flip-flopping
+        if self.state != GameState.PLAYING:
+            return
+        self.adapt_time += frame_time
+        self.adapt_frames += 1
+        if self.adapt_frames < RENDER_ADAPT_FRAMES:
+            return
+        mean = self.adapt_time / self.adapt_frames
+        self.adapt_time = 0.0
+        self.adapt_frames = 0
+        index = RENDER_SCALES.index(self.render_scale)
+        if mean > RENDER_BUDGET and index + 1 < len(RENDER_SCALES):
+            self.set_render_scale(RENDER_SCALES[index + 1])
+        elif mean < RENDER_BUDGET * RENDER_HEADROOM and index > 0:
+            self.set_render_scale(RENDER_SCALES[index - 1])
+
+    def draw_hud(self, surface, render_scale=1):
+        text = self.text if render_scale == 1 else self.scaled_text
+        s = render_scale
         # Draw oxygen bar
-        pygame.draw.rect(self.screen, BLACK, (10, 10, 204, 24))
-        pygame.draw.rect(self.screen, BLUE, (12, 12, self.player.oxygen * 2, 20))
-        oxygen_text = self.font.render(f"Oxygen: {int(self.player.oxygen)}%", True, WHITE)
-        self.screen.blit(oxygen_text, (220, 12))
+        pygame.draw.rect(surface, BLACK, (10 * s, 10 * s, 204 * s, 24 * s))
+        pygame.draw.rect(surface, BLUE, (12 * s, 12 * s, self.player.oxygen * 2 * s, 20 * s))
+        oxygen_text = text.render(f"Oxygen: {int(self.player.oxygen)}%")
+        surface.blit(oxygen_text, (220 * s, 12 * s))
         
         # Draw level indicator
-        level_text = self.font.render(f"Level: {self.current_level}", True, WHITE)
-        self.screen.blit(level_text, (WINDOW_WIDTH - 120, 12))
+        level_text = text.render(f"Level: {self.current_level}")
+        surface.blit(level_text, ((WINDOW_WIDTH - 120) * s, 12 * s))
+
+    def draw_scene(self):
+        # The level, entities and HUD. Returns the screen rects that differ
+        # from the previous frame, or None when the view moved and all of it did.
+        # Below a render scale of 1 the world is drawn into world_surface, a
+        # fraction of the window's size, and scaled up to the window in one pass.
+        render_scale = self.render_scale
+        surface = self.screen
+        if self.world_surface is not None:
+            surface = self.world_surface
+            surface.fill(BLACK)
+        
+        # Only entities overlapping the camera are drawn
+        view_rect = self.camera.view_rect()
+        stations = self.level.visible_stations(view_rect)
+        voidwalkers = self.level.visible_voidwalkers(view_rect)
+        
+        # Draw level (walls and exit are pre-rendered)
+        chunks_drawn = self.level.static_layer.draw(surface, self.camera.x, self.camera.y,
+                                                    render_scale)
+        
+        # Stations, voidwalkers and then the player go out in one
+        # blits call, in that stacking order
+        camera_x, camera_y = self.camera.x, self.camera.y
+        batch = [station.blit_item(camera_x, camera_y, render_scale) for station in stations]
+        batch += [voidwalker.blit_item(camera_x, camera_y, render_scale)
+                  for voidwalker in voidwalkers]
+        batch.append(self.player.blit_item(camera_x, camera_y, render_scale))
+        sprites = surface.blits(batch)
+        
+        self.render_stats = {
+            "static_chunks": (chunks_drawn, len(self.level.static_layer.chunks) - chunks_drawn),
+            "oxygen_stations": (len(stations), len(self.level.oxygen_stations) - len(stations)),
+            "voidwalkers": (len(voidwalkers), len(self.level.voidwalkers) - len(voidwalkers)),
+        }
+        
+        # Draw HUD, at full resolution unless native_hud is off
+        if surface is not self.screen:
+            if not self.native_hud:
+                self.draw_hud(surface, render_scale)
+            pygame.transform.scale(surface, (WINDOW_WIDTH, WINDOW_HEIGHT), self.screen)
+        if surface is self.screen or self.native_hud:
+            self.draw_hud(self.screen)
+        
+        # With the same level and camera position the background is
+        # unchanged: only where sprites were or are now, and the HUD, differ
+        view = (self.level, camera_x, camera_y)
+        dirty = None
+        if view == self.shown_view:
+            dirty = sprites + self.shown_sprites
+            if surface is not self.screen:
+                dirty = [self.window_rect(rect, render_scale) for rect in dirty]
+            dirty.append(pygame.Rect(0, 0, WINDOW_WIDTH, HUD_HEIGHT))
+        self.shown_view = view
+        self.shown_sprites = sprites
+        return dirty
+
+    @staticmethod
+    def window_rect(rect, render_scale):
+        # The window pixels a world_surface rect is scaled up onto
+        left = rect.left // render_scale
+        top = rect.top // render_scale
+        return pygame.Rect(left, top, math.ceil(rect.right / render_scale) - left,
+                           math.ceil(rect.bottom / render_scale) - top)
 
     def draw(self):
-        self.screen.fill(BLACK)
+        start = time.perf_counter()
+        if self.world_surface is None or self.state not in (GameState.PLAYING, GameState.PAUSED):
+            # A scaled-up scene covers the whole window anyway
+            self.screen.fill(BLACK)
+        # Rects of the screen that changed, or None to update all of it
+        dirty = None
         
         if self.state == GameState.MENU:
             # Draw menu
-            title = self.font.render("Eclipse Protocol: Lost in the Void", True, WHITE)
-            start_text = self.font.render("Press SPACE to Start", True, WHITE)
-            controls_text = self.font.render("WASD to move", True, WHITE)
+            title = self.text.render("Eclipse Protocol: Lost in the Void")
+            start_text = self.text.render("Press SPACE to Start")
+            controls_text = self.text.render("WASD to move")
             
             self.screen.blit(title, (WINDOW_WIDTH//2 - title.get_width()//2, WINDOW_HEIGHT//3))
             self.screen.blit(start_text, (WINDOW_WIDTH//2 - start_text.get_width()//2, WINDOW_HEIGHT//2))
             self.screen.blit(controls_text, (WINDOW_WIDTH//2 - controls_text.get_width()//2, WINDOW_HEIGHT//2 + 50))
         
-        elif self.state == GameState.PLAYING:
-            # Draw level
-            for wall in self.level.walls:
-                wall.draw(self.screen, self.camera.x, self.camera.y)
-            
-            for station in self.level.oxygen_stations:
-                station.draw(self.screen, self.camera.x, self.camera.y)
-            
-            # Draw exit
-            exit_screen_x = self.level.exit_rect.x - self.camera.x
-            exit_screen_y = self.level.exit_rect.y - self.camera.y
-            pygame.draw.rect(self.screen, GREEN, (exit_screen_x, exit_screen_y, TILE_SIZE, TILE_SIZE))
-            
-            # Draw voidwalkers
-            for voidwalker in self.level.voidwalkers:
-                voidwalker.draw(self.screen, self.camera.x, self.camera.y)
-            
-            # Draw player
-            self.player.draw(self.screen, self.camera.x, self.camera.y)
-            
-            # Draw HUD
-            self.draw_hud()
+        elif self.state in (GameState.PLAYING, GameState.PAUSED):
+            dirty = self.draw_scene()
+            if self.state == GameState.PAUSED:
+                # The frozen scene, dimmed, under the pause text
+                shade = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+                shade.fill((0, 0, 0, 160))
+                self.screen.blit(shade, (0, 0))
+                paused_text = self.text.render("PAUSED")
+                resume_text = self.text.render("Press ESC to Resume")
+                self.screen.blit(paused_text,
+                               (WINDOW_WIDTH//2 - paused_text.get_width()//2, WINDOW_HEIGHT//3))
+                self.screen.blit(resume_text,
+                               (WINDOW_WIDTH//2 - resume_text.get_width()//2, WINDOW_HEIGHT//2))
+                dirty = None
         
         elif self.state == GameState.GAME_OVER:
             if self.victory:
-                victory_text = self.font.render("Congratulations! You Reached Your Home!", True, WHITE)
-                restart_text = self.font.render("Press R to Play Again", True, WHITE)
+                victory_text = self.text.render("Congratulations! You Reached Your Home!")
+                restart_text = self.text.render("Press R to Play Again")
                 
                 self.screen.blit(victory_text, 
                                (WINDOW_WIDTH//2 - victory_text.get_width()//2, WINDOW_HEIGHT//3))
                 self.screen.blit(restart_text, 
                                (WINDOW_WIDTH//2 - restart_text.get_width()//2, WINDOW_HEIGHT//2))
             else:
-                # Different messages based on death type
-                if self.death_cause == "oxygen":
-                    death_messages = [
-                        "Oops! Forgot to breathe?"
-                    ]
-                elif self.death_cause == "voidwalker":
-                    death_messages = [
-                        "Voidwalker just wanted a hug!"
-                    ]
-                
-                # Pick a random message
-                game_over_text = self.font.render(random.choice(death_messages), True, WHITE)
-                restart_text = self.font.render("Press R to Restart", True, WHITE)
+                game_over_text = self.text.render(self.death_message)
+                restart_text = self.text.render("Press R to Restart")
                 
                 self.screen.blit(game_over_text, 
                                (WINDOW_WIDTH//2 - game_over_text.get_width()//2, WINDOW_HEIGHT//3))
@@ -505,15 +2220,27 @@ class Game:
                                (WINDOW_WIDTH//2 - restart_text.get_width()//2, WINDOW_HEIGHT//2))
         
         elif self.state == GameState.LEVEL_COMPLETE:
-            complete_text = self.font.render("Level Complete!", True, WHITE)
-            next_text = self.font.render("Press SPACE for Next Level", True, WHITE)
+            complete_text = self.text.render("Level Complete!")
+            next_text = self.text.render("Press SPACE for Next Level")
             
             self.screen.blit(complete_text, 
                            (WINDOW_WIDTH//2 - complete_text.get_width()//2, WINDOW_HEIGHT//3))
             self.screen.blit(next_text, 
                            (WINDOW_WIDTH//2 - next_text.get_width()//2, WINDOW_HEIGHT//2))
 
-        pygame.display.flip()
+        if self.state != GameState.PLAYING:
+            # Static screens are drawn whole, and the next scene frame too
+            self.shown_view = None
+        if self.profiler.show_overlay:
+            panel = self.profiler.draw_overlay(self.screen)
+            if dirty is not None:
+                dirty.append(panel)
+        start = self.profiler.add("draw", start)
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        self.profiler.add("flip", start)
 
     def reset_game(self):
         self.score = 0
@@ -523,74 +2250,347 @@ class Game:
         self.state = GameState.PLAYING
         self.victory = False
         self.death_cause = None
+        self.death_message = None
         self.reset_level()
 
+    def handle_event(self, event):
+        # Returns False when the game should quit
+        if event.type == pygame.QUIT:
+            return False
+        elif event.type == pygame.KEYDOWN:
+            if self.recorder is not None:
+                self.recorder.key_event(event.key)
+            if event.key == pygame.K_SPACE:
+                if self.state == GameState.MENU:
+                    self.finish_loading()
+                    self.state = GameState.PLAYING
+                elif self.state == GameState.LEVEL_COMPLETE:
+                    self.reset_level()
+                    self.state = GameState.PLAYING
+            elif event.key == pygame.K_r and self.state == GameState.GAME_OVER:
+                self.reset_game()
+            elif event.key == pygame.K_F3:
+                self.profiler.show_overlay = not self.profiler.show_overlay
+                # Redraw whole, so a hidden overlay doesn't stay on screen
+                self.shown_view = None
+            elif event.key == pygame.K_F5 and self.state == GameState.PLAYING:
+                self.checkpoint = bytes(self.capture_snapshot())
+            elif event.key == pygame.K_F9 and self.checkpoint is not None and self.can_rewind():
+                if self.restore_snapshot(self.checkpoint):
+                    # The history after the checkpoint is another timeline
+                    self.rewind.clear()
+                else:
+                    self.checkpoint = None
+            elif event.key == pygame.K_BACKSPACE and self.can_rewind():
+                data = self.rewind.rewind(round(REWIND_STEP / (SNAPSHOT_INTERVAL * FIXED_DT)))
+                if data is not None and not self.restore_snapshot(data):
+                    self.rewind.clear()
+            elif event.key == pygame.K_ESCAPE:
+                if self.state == GameState.PLAYING:
+                    self.state = GameState.PAUSED
+                elif self.state == GameState.PAUSED:
+                    self.state = GameState.PLAYING
+        return True
+
+    def update_progress(self):
+        # Update distance based on level
+        if self.score >= self.current_distance:
+            self.current_level += 1
+            if self.current_level == 2:
+                self.current_distance = MEDIUM_DISTANCE
+                self.game_speed = 2.5
+            elif self.current_level == 3:
+                self.current_distance = HARD_DISTANCE
+                self.game_speed = 4
+            elif self.current_level == 4:
+                self.current_distance = EXPERT_DISTANCE
+                self.game_speed = 5.5
+            elif self.current_level == 5:
+                self.current_distance = MASTER_DISTANCE
+                self.game_speed = 7
+            elif self.current_level > 5:
+                self.victory = True
+                self.state = GameState.GAME_OVER
+            
+            print(f"Level {self.current_level} reached! Speed: {self.game_speed}x")
+
+    def step(self, dt=FIXED_DT, movement=None):
+        # One simulation tick; never touches the screen
+        if self.recorder is not None:
+            bits = self.read_keys() if movement is None else recording.bits_from_movement(movement)
+            self.recorder.tick(bits)
+            movement = recording.movement_from_bits(bits)
+        if self.state == GameState.PLAYING:
+            start = time.perf_counter()
+            self.handle_input(dt, movement)
+            self.profiler.add("input", start)
+            self.profiler.steps += 1
+            self.update(dt)
+            self.update_progress()
+            if self.state == GameState.PLAYING and self.level.ai.tick % SNAPSHOT_INTERVAL == 0:
+                self.rewind.push(self.capture_snapshot())
+
+    def simulate(self, ticks, policy=None):
+        # Runs fixed-size ticks as fast as the CPU allows, without drawing.
+        # policy(game) returns the (dx, dy) movement for each tick.
+        for tick in range(ticks):
+            if self.state != GameState.PLAYING:
+                return tick
+            movement = policy(self) if policy is not None else (0, 0)
+            # Each tick is profiled as a frame of its own
+            self.profiler.begin_frame()
+            self.step(FIXED_DT, movement)
+            self.profiler.end_frame(self.entity_counts())
+        return ticks
+
+    def state_checksum(self):
+        # CRC of the simulation state a replay has to reproduce
+        self.level.sync_voidwalkers()
+        values = [self.state.value, self.current_level,
+                  self.player.x, self.player.y, self.player.oxygen]
+        for voidwalker in self.level.voidwalkers:
+            values += (voidwalker.x, voidwalker.y)
+        return zlib.crc32(struct.pack(f"<{len(values)}d", *values))
+
+    def entity_counts(self):
+        # Matches FrameProfiler.COUNTS after "steps"
+        if self.level is None:
+            return (0, 0, 0, 0)
+        drawn = self.render_stats.get("voidwalkers", (0, 0))[0]
+        return (len(self.level.voidwalkers), len(self.level.oxygen_stations),
+                len(self.level.walls), drawn)
+
+    def is_idle(self):
+        # Nothing moves on screen until input arrives
+        if self.playback is not None and not self.playback.finished:
+            return False
+        return self.state != GameState.PLAYING
+
     def run(self):
         last_time = pygame.time.get_ticks()
+        accumulator = 0.0
         
         running = True
+        drawn_state = None
         
         while running:
-            # Calculate delta time
+            events = []
+            if self.is_idle() and not self.needs_redraw and self.state == drawn_state:
+                # Static screen already up: sleep until there is input. The
+                # timeout only keeps an eye on the background loader.
+                event = pygame.event.wait(IDLE_WAIT_MS)
+                if event.type != pygame.NOEVENT:
+                    events.append(event)
+                # Time spent asleep isn't owed to the simulation
+                last_time = pygame.time.get_ticks()
+                accumulator = 0.0
+            
+            self.profiler.begin_frame()
+            
+            # Real time since the last frame, clamped so a stall can't
+            # queue up an unbounded number of simulation steps
             current_time = pygame.time.get_ticks()
-            dt = (current_time - last_time) / 1000.0  # Convert to seconds
+            accumulator += min((current_time - last_time) / 1000.0, MAX_FRAME_TIME)
             last_time = current_time
             
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+            start = time.perf_counter()
+            events += pygame.event.get()
+            for event in events:
+                if event.type != pygame.MOUSEMOTION:
+                    self.needs_redraw = True
+                if (self.playback is not None and event.type == pygame.KEYDOWN and
+                        event.key != pygame.K_F3):
+                    # Key presses come from the log during playback
+                    continue
+                if not self.handle_event(event):
                     running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE:
-                        if self.state == GameState.MENU:
-                            self.state = GameState.PLAYING
-                        elif self.state == GameState.LEVEL_COMPLETE:
-                            self.reset_level()
-                            self.state = GameState.PLAYING
-                    elif event.key == pygame.K_r and self.state == GameState.GAME_OVER:
-                        self.reset_game()
-                    elif event.key == pygame.K_ESCAPE:
-                        if self.state == GameState.PLAYING:
-                            self.state = GameState.PAUSED
-                        elif self.state == GameState.PAUSED:
-                            self.state = GameState.PLAYING
-
-            if self.state == GameState.PLAYING:
-                self.handle_input(dt)
-                self.update(dt)
+            self.profiler.add("events", start)
             
-                # Update distance based on level
-                if self.score >= self.current_distance:
-                    self.current_level += 1
-                    if self.current_level == 2:
-                        self.current_distance = MEDIUM_DISTANCE
-                        self.game_speed = 2.5
-                    elif self.current_level == 3:
-                        self.current_distance = HARD_DISTANCE
-                        self.game_speed = 4
-                    elif self.current_level == 4:
-                        self.current_distance = EXPERT_DISTANCE
-                        self.game_speed = 5.5
-                    elif self.current_level == 5:
-                        self.current_distance = MASTER_DISTANCE
-                        self.game_speed = 7
-                    elif self.current_level > 5:
-                        self.victory = True
-                        self.state = GameState.GAME_OVER
-                    
-                    print(f"Level {self.current_level} reached! Speed: {self.game_speed}x")
+            if self.startup_report and self.loading_done():
+                print(self.startup.report())
+                self.startup_report = False
             
-            # Display level and progress
-            level_text = self.font.render(f"Level: {self.current_level}", True, WHITE)
-            progress_text = self.font.render(f"Progress: {self.score}/{self.current_distance}", True, WHITE)
-            self.screen.blit(level_text, (10, 40))
-            self.screen.blit(progress_text, (10, 70))
+            # Advance the simulation in fixed steps, then draw once
+            while accumulator >= FIXED_DT:
+                if self.playback is not None:
+                    self.playback.advance()
+                else:
+                    self.step(FIXED_DT)
+                accumulator -= FIXED_DT
             
+            if self.is_idle() and not self.needs_redraw and self.state == drawn_state:
+                continue
             self.draw()
+            self.needs_redraw = False
+            drawn_state = self.state
+            self.profiler.end_frame(self.entity_counts())
+            if self.adaptive_resolution:
+                self.adapt_render_scale(self.profiler.last_frame)
             self.clock.tick(FPS)
 
+        if self.recorder is not None:
+            self.recorder.close(self.state_checksum() if self.loaded else None)
+            self.recorder = None
+        if self.profile_out:
+            self.profiler.export(self.profile_out)
+            print(f"Wrote {min(self.profiler.frames, self.profiler.capacity)} frames to {self.profile_out}")
         pygame.quit()
         sys.exit()
 
+class Replayer:
+    # Plays an InputLog back through a Game, tick by tick. Seeking forward
+    # simulates without drawing; seeking backward restarts from tick 0.
+    def __init__(self, game, log):
+        self.game = game
+        self.log = log
+        self.restart()
+
+    def restart(self):
+        self.game.start_session(self.log.level)
+        self.inputs = self.log.inputs()
+        self.tick = 0
+        self.finished = False
+
+    def advance(self):
+        # Plays one tick; False once the log is used up
+        if self.finished:
+            return False
+        entry = next(self.inputs, None)
+        if entry is None:
+            # Presses made after the last tick, then stop
+            for key in self.log.trailing_events:
+                self.game.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+            self.finished = True
+            return False
+        _, bits, events = entry
+        for key in events:
+            self.game.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+        self.game.step(FIXED_DT, recording.movement_from_bits(bits))
+        self.tick += 1
+        return True
+
+    def seek(self, tick):
+        if tick < self.tick or self.finished:
+            self.restart()
+        while self.tick < tick and self.advance():
+            pass
+        return self.tick
+
+    def play_to_end(self):
+        while self.advance():
+            pass
+        return self.tick
+
+    def verify(self):
+        # True/False against the recorded checksum, None if the log has none
+        if self.log.checksum is None or not self.finished:
+            return None
+        return self.game.state_checksum() == self.log.checksum
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Eclipse Protocol: Lost in the Void")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the simulation without a window or audio")
+    parser.add_argument("--ticks", type=int, default=FPS * 60,
+                        help="simulation ticks to run in headless mode")
+    parser.add_argument("--level", type=int, default=None,
+                        help="level index to start on")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="random seed for reproducible runs")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print where startup time went")
+    parser.add_argument("--profile-out", default=None, metavar="PATH",
+                        help="write per-frame timings to PATH (.csv or .json) on exit")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="record the session's input to PATH for replaying")
+    parser.add_argument("--replay", default=None, metavar="PATH",
+                        help="play back an input log (as fast as possible with --headless)")
+    parser.add_argument("--seek", type=int, default=None, metavar="TICK",
+                        help="with --replay, jump to TICK before playing on")
+    parser.add_argument("--render-scale", type=float, default=1.0, choices=RENDER_SCALES,
+                        help="draw the world at this fraction of the window's resolution")
+    parser.add_argument("--adaptive-resolution", action="store_true",
+                        help="lower the render scale while frames run over budget")
+    parser.add_argument("--low-res-hud", action="store_true",
+                        help="draw the HUD at the render scale too, instead of full resolution")
+    return parser.parse_args(argv)
+
+def apply_render_options(game, args):
+    game.native_hud = not args.low_res_hud
+    game.adaptive_resolution = args.adaptive_resolution
+    game.set_render_scale(args.render_scale)
+
+def run_headless(args):
+    game = Game(headless=True, seed=args.seed)
+    if args.startup_report:
+        print(game.startup.report())
+    if args.level is not None:
+        game.current_level = args.level
+        game.reset_level()
+    game.state = GameState.PLAYING
+    
+    start = pygame.time.get_ticks()
+    ticks = game.simulate(args.ticks)
+    elapsed = max(pygame.time.get_ticks() - start, 1) / 1000.0
+    
+    print(f"Simulated {ticks} ticks ({ticks * FIXED_DT:.1f}s game time) in {elapsed:.3f}s "
+          f"({ticks / elapsed:.0f} ticks/s)")
+    print(f"State: {game.state.name}, death cause: {game.death_cause}, "
+          f"oxygen: {game.player.oxygen:.1f}")
+    if args.profile_out:
+        game.profiler.export(args.profile_out)
+        print(f"Wrote {min(game.profiler.frames, game.profiler.capacity)} ticks to {args.profile_out}")
+    pygame.quit()
+
+def run_replay(args):
+    log = recording.InputLog.load(args.replay)
+    game = Game(headless=args.headless, seed=log.seed)
+    game.finish_loading()
+    replayer = Replayer(game, log)
+    
+    start = time.perf_counter()
+    if args.seek is not None:
+        replayer.seek(args.seek)
+    if not args.headless:
+        print(f"Replaying {args.replay} from tick {replayer.tick} of {log.ticks}")
+        game.playback = replayer
+        game.profile_out = args.profile_out
+        apply_render_options(game, args)
+        game.run()
+        return
+    if args.seek is None:
+        replayer.play_to_end()
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    
+    print(f"Replayed {replayer.tick}/{log.ticks} ticks ({replayer.tick * FIXED_DT:.1f}s game time) "
+          f"in {elapsed:.3f}s ({replayer.tick / elapsed:.0f} ticks/s)")
+    print(f"State: {game.state.name}, level: {game.current_level}, "
+          f"death cause: {game.death_cause}, oxygen: {game.player.oxygen:.1f}")
+    verified = replayer.verify()
+    if verified is not None:
+        print("Checksum matches the recording" if verified else "Checksum DIFFERS from the recording")
+    pygame.quit()
+    if verified is False:
+        sys.exit(1)
+
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    args = parse_args()
+    if args.replay:
+        run_replay(args)
+    elif args.headless:
+        run_headless(args)
+    else:
+        seed = args.seed
+        if args.record and seed is None:
+            # A recording has to pin the seed to replay the same way
+            seed = random.SystemRandom().randrange(2 ** 31)
+        game = Game(seed=seed)
+        game.startup_report = args.startup_report
+        game.profile_out = args.profile_out
+        apply_render_options(game, args)
+        if args.level is not None:
+            game.current_level = args.level
+            game.reset_level()
+        if args.record:
+            game.recorder = recording.InputRecorder(args.record, seed, game.current_level, FPS)
+        game.run()
\ No newline at end of file
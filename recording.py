@@ -0,0 +1,150 @@
+# recording.py
+# Compact binary input logs for deterministic replays. A log holds the RNG
+# seed and starting level, then one entry per simulation tick: the WASD keys
+# held during that tick and any key presses handled just before it. Runs of
+# identical ticks are stored once with a repeat count, so an hour of play is
+# usually a few kilobytes.
+import struct
+
+MAGIC = b"ECRP"
+VERSION = 1
+
+# magic, version, ticks per second, seed, starting level
+HEADER = struct.Struct("<4sHHqH")
+REPEAT = struct.Struct("<H")
+EVENT_COUNT = struct.Struct("<B")
+KEY = struct.Struct("<I")
+# ticks recorded, whether a checksum follows, final state checksum
+TRAILER = struct.Struct("<QBI")
+
+# Input bits in the low nibble of each entry
+KEY_W = 0x01
+KEY_A = 0x02
+KEY_S = 0x04
+KEY_D = 0x08
+# Entry flags
+HAS_REPEAT = 0x20  # a uint16 count follows; the entry covers that many ticks
+HAS_EVENTS = 0x40  # a count and uint32 key codes follow, applied before the tick
+NO_TICK = 0x80  # key presses after the last tick
+END = 0xFF  # the trailer follows
+
+MAX_REPEAT = 0xFFFF
+MAX_EVENTS = 0xFF
+
+def movement_from_bits(bits):
+    # WASD bits to the (dx, dy) handle_input expects
+    return (bool(bits & KEY_D) - bool(bits & KEY_A),
+            bool(bits & KEY_S) - bool(bits & KEY_W))
+
+def bits_from_movement(movement):
+    dx, dy = movement
+    return ((KEY_D if dx > 0 else KEY_A if dx < 0 else 0) |
+            (KEY_S if dy > 0 else KEY_W if dy < 0 else 0))
+
+class InputRecorder:
+    # Streams a log to disk as the game runs
+    def __init__(self, path, seed, level, ticks_per_second):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, ticks_per_second, seed, level))
+        self.events = []
+        self.run_bits = 0
+        self.run_length = 0
+        self.ticks = 0
+
+    def key_event(self, key):
+        # Applied before the next tick
+        self.events.append(key)
+
+    def tick(self, bits):
+        self.ticks += 1
+        if self.events:
+            self.flush_run()
+            self.write_events(bits | HAS_EVENTS)
+        elif bits == self.run_bits and 0 < self.run_length < MAX_REPEAT:
+            self.run_length += 1
+        else:
+            self.flush_run()
+            self.run_bits = bits
+            self.run_length = 1
+
+    def write_events(self, entry):
+        # More presses than fit in one entry spill into tick-less ones first
+        while len(self.events) > MAX_EVENTS:
+            chunk, self.events = self.events[:MAX_EVENTS], self.events[MAX_EVENTS:]
+            self.file.write(bytes((NO_TICK | HAS_EVENTS,)) + EVENT_COUNT.pack(len(chunk)))
+            self.file.write(b"".join(KEY.pack(key) for key in chunk))
+        self.file.write(bytes((entry,)) + EVENT_COUNT.pack(len(self.events)))
+        self.file.write(b"".join(KEY.pack(key) for key in self.events))
+        self.events = []
+
+    def flush_run(self):
+        if self.run_length == 1:
+            self.file.write(bytes((self.run_bits,)))
+        elif self.run_length > 1:
+            self.file.write(bytes((self.run_bits | HAS_REPEAT,)) + REPEAT.pack(self.run_length))
+        self.run_length = 0
+
+    def close(self, checksum=None):
+        self.flush_run()
+        if self.events:
+            self.write_events(NO_TICK | HAS_EVENTS)
+        self.file.write(bytes((END,)) + TRAILER.pack(
+            self.ticks, checksum is not None, checksum or 0))
+        self.file.close()
+
+class InputLog:
+    # A decoded log: entries of (first tick, bits, tick count, key presses).
+    # A log cut short by a crash still replays up to where it stops; it just
+    # has no checksum to verify against.
+    def __init__(self, data):
+        magic, version, self.ticks_per_second, self.seed, self.level = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not an input log of this version")
+        self.entries = []
+        self.trailing_events = ()
+        self.checksum = None
+        offset = HEADER.size
+        tick = 0
+        pending = []
+        try:
+            while offset < len(data):
+                entry = data[offset]
+                offset += 1
+                if entry == END:
+                    _, has_checksum, checksum = TRAILER.unpack_from(data, offset)
+                    if has_checksum:
+                        self.checksum = checksum
+                    break
+                count = 1
+                if entry & HAS_REPEAT:
+                    count, = REPEAT.unpack_from(data, offset)
+                    offset += REPEAT.size
+                if entry & HAS_EVENTS:
+                    events, = EVENT_COUNT.unpack_from(data, offset)
+                    offset += EVENT_COUNT.size
+                    for _ in range(events):
+                        pending.append(KEY.unpack_from(data, offset)[0])
+                        offset += KEY.size
+                if entry & NO_TICK:
+                    continue
+                self.entries.append((tick, entry & 0x0F, count, tuple(pending)))
+                pending = []
+                tick += count
+        except struct.error:
+            # Truncated mid-entry
+            pass
+        self.trailing_events = tuple(pending)
+        self.ticks = tick
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def inputs(self, start=0):
+        # (tick, bits, key presses) for every tick from `start` on
+        for first, bits, count, events in self.entries:
+            if first + count <= start:
+                continue
+            for tick in range(max(first, start), first + count):
+                yield tick, bits, events if tick == first else ()
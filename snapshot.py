@@ -0,0 +1,186 @@
+# snapshot.py
+# Compact snapshots of the simulation's moving parts, for rewind and
+# checkpoints without rebuilding the level. A snapshot is a fixed header
+# (AI clock and the player) followed by one fixed-size record per resident
+# voidwalker. RewindBuffer keeps recent snapshots in one preallocated block
+# of memory: every so often a keyframe is stored whole, and in between only
+# the voidwalker records that differ from it.
+import struct
+from collections import deque
+
+# level resident version, level index, AI tick, AI clock, player x/y,
+# oxygen, player animation timer, player animation frame, player flags,
+# voidwalker count
+HEADER = struct.Struct("<IIIdddddBBI")
+# Voidwalker record fields, in order. main.py builds a matching NumPy dtype
+# for VoidwalkerSwarm from the same list.
+WALKER_FIELDS = (
+    ("x", "d"), ("y", "d"), ("anim_timer", "d"), ("last_update_time", "d"),
+    ("next_update", "i"), ("last_update_tick", "i"),
+    ("attack_cooldown", "f"), ("teleport_cooldown", "f"),
+    ("anim_frame", "B"), ("update_interval", "B"), ("flags", "B"),
+)
+WALKER = struct.Struct("<" + "".join(code for _, code in WALKER_FIELDS))
+# Delta entries: header, changed record count, then (index, record) pairs
+COUNT = struct.Struct("<I")
+INDEX = struct.Struct("<I")
+
+# Player flags
+PLAYER_FACING_LEFT = 0x01
+# Voidwalker flags
+WALKER_MOVING_RIGHT = 0x01
+WALKER_FACING_LEFT = 0x02
+WALKER_CHASING = 0x04
+WALKER_CAN_TELEPORT = 0x08
+
+KEYFRAME_INTERVAL = 30  # Snapshots per keyframe at most
+
+class RewindBuffer:
+    # Ring of recent snapshots. Entries are written one after another and
+    # wrap to the start; writing over the oldest drops them, and a dropped
+    # keyframe takes its deltas along. Each entry is [offset, size,
+    # keyframe entry, sequence number, record count].
+    def __init__(self, capacity, keyframe_interval=KEYFRAME_INTERVAL):
+        self.data = bytearray(capacity)
+        self.view = memoryview(self.data)
+        self.keyframe_interval = keyframe_interval
+        self.entries = deque()
+        self.keyframe = None
+        self.head = 0
+        self.sequence = 0
+        # A decoded snapshot; reused by every restore
+        self.scratch = bytearray()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.keyframe = None
+        self.head = 0
+
+    def push(self, snapshot):
+        # snapshot is a HEADER followed by its voidwalker records
+        count = HEADER.unpack_from(snapshot)[-1]
+        size = HEADER.size + count * WALKER.size
+        changed = self.changed_records(snapshot, count)
+        if changed is not None:
+            delta_size = HEADER.size + COUNT.size + len(changed) * (INDEX.size + WALKER.size)
+            if delta_size < size and self.allocate(delta_size, self.keyframe):
+                self.write_delta(snapshot, changed)
+                return True
+        if not self.allocate(size, None):
+            return False
+        self.view[self.head:self.head + size] = snapshot[:size]
+        self.keyframe = self.append(size, None, count)
+        return True
+
+    def changed_records(self, snapshot, count):
+        # Indices of the records that differ from the keyframe, or None when
+        # this snapshot has to be a keyframe
+        keyframe = self.keyframe
+        if keyframe is None or self.sequence - keyframe[3] >= self.keyframe_interval:
+            return None
+        # Same resident version and count, so the records line up
+        if keyframe[4] != count or self.view[keyframe[0]:keyframe[0] + 4] != snapshot[:4]:
+            return None
+        base = keyframe[0] + HEADER.size
+        size = WALKER.size
+        data = self.view
+        return [i for i in range(count)
+                if data[base + i * size:base + (i + 1) * size] !=
+                snapshot[HEADER.size + i * size:HEADER.size + (i + 1) * size]]
+
+    def write_delta(self, snapshot, changed):
+        offset = self.head
+        data = self.view
+        data[offset:offset + HEADER.size] = snapshot[:HEADER.size]
+        offset += HEADER.size
+        COUNT.pack_into(self.data, offset, len(changed))
+        offset += COUNT.size
+        for i in changed:
+            INDEX.pack_into(self.data, offset, i)
+            offset += INDEX.size
+            start = HEADER.size + i * WALKER.size
+            data[offset:offset + WALKER.size] = snapshot[start:start + WALKER.size]
+            offset += WALKER.size
+        self.append(offset - self.head, self.keyframe, self.keyframe[4])
+
+    def append(self, size, keyframe, count):
+        entry = [self.head, size, keyframe, self.sequence, count]
+        if keyframe is None:
+            entry[2] = entry
+        self.entries.append(entry)
+        self.head += size
+        self.sequence += 1
+        return entry
+
+    def allocate(self, size, keyframe):
+        # Frees room for `size` bytes at the head, wrapping to the start if
+        # the end is too short. Returns False if that would drop `keyframe`.
+        if size > len(self.data):
+            self.clear()
+            return False
+        wrap = self.head + size > len(self.data)
+        start = 0 if wrap else self.head
+        end = start + size
+        while self.entries:
+            # Entries at or past the head are left from the previous lap and
+            # are the oldest; they go if they are in the way, or all of them
+            # when wrapping. Then, when wrapping, the ones at the start.
+            oldest = self.entries[0][0]
+            if oldest >= self.head:
+                if not wrap and oldest >= end:
+                    break
+            elif not wrap or oldest >= end:
+                break
+            if self.entries[0][2] is keyframe:
+                return False
+            self.drop_oldest()
+        self.head = start
+        return True
+
+    def drop_oldest(self):
+        dropped = self.entries.popleft()
+        if dropped[2] is dropped:
+            while self.entries and self.entries[0][2] is dropped:
+                self.entries.popleft()
+            if self.keyframe is dropped:
+                self.keyframe = None
+
+    def rewind(self, steps):
+        # Decodes the snapshot `steps` entries before the newest and forgets
+        # everything after it, so the next push continues from there.
+        # Returns None when the buffer is empty.
+        if not self.entries:
+            return None
+        while len(self.entries) > 1 and steps > 0:
+            self.entries.pop()
+            steps -= 1
+        entry = self.entries[-1]
+        self.head = entry[0] + entry[1]
+        self.keyframe = entry[2]
+        self.sequence = entry[3] + 1
+        return self.decode(entry)
+
+    def decode(self, entry):
+        keyframe = entry[2]
+        size = keyframe[1]
+        if len(self.scratch) < size:
+            self.scratch = bytearray(size)
+        scratch = memoryview(self.scratch)
+        data = self.view
+        scratch[:size] = data[keyframe[0]:keyframe[0] + size]
+        if entry is not keyframe:
+            offset = entry[0]
+            scratch[:HEADER.size] = data[offset:offset + HEADER.size]
+            offset += HEADER.size
+            changed, = COUNT.unpack_from(self.data, offset)
+            offset += COUNT.size
+            for _ in range(changed):
+                i, = INDEX.unpack_from(self.data, offset)
+                offset += INDEX.size
+                start = HEADER.size + i * WALKER.size
+                scratch[start:start + WALKER.size] = data[offset:offset + WALKER.size]
+                offset += WALKER.size
+        return scratch[:size]